@@ -0,0 +1,261 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+
+from SpeechRecognizer import SpeechRecognizer
+from Tracer import tracer
+
+MIN_BLOCK_BYTES = 30 * 16000 * 4  # 30 s of float32 audio at 16 kHz
+LOAD_TIMEOUT = 600  # seconds; the first load may download the model
+
+
+def _serve(conn, config, threads):
+    """Worker process: load the model once, then decode requests until told to stop.
+
+    Requests are (method, source, length, prompt) tuples. `source` is the
+    name of a shared memory block holding `length` float32 samples, or a
+    file path (a list of them for "transcribe_batch") when `length` is None.
+    """
+    if threads:
+        config.config.setdefault("whisper", {})["threads"] = threads
+    recognizer = SpeechRecognizer(config)
+    if not recognizer.load_model():
+        conn.send(("error", "Couldn't load the Whisper model"))
+        return
+    if config.get_value("startup", "warm_up", True):
+        recognizer.warm_up()
+    conn.send(("ready", None))
+
+    block = None
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break  # the main process has gone
+        if request is None:
+            break
+        method, source, length, prompt = request
+        if length is None:
+            audio_data = source
+        else:
+            if block is None or block.name != source:
+                if block is not None:
+                    block.close()
+                block = shared_memory.SharedMemory(name=source)
+                # Attaching registers the block with this process's resource
+                # tracker (bpo-39959), which would unlink it when we exit; the
+                # main process owns it.
+                resource_tracker.unregister(block._name, "shared_memory")
+            # Copy out so the model holds no reference into the block.
+            audio_data = np.ndarray((length,), dtype=np.float32, buffer=block.buf).copy()
+        conn.send(getattr(recognizer, method)(audio_data, prompt))
+    if block is not None:
+        block.close()
+
+
+class _Worker:
+    """One worker process, its pipe and the shared memory block it reads audio from."""
+
+    def __init__(self, context, config, threads, timeout):
+        self.context = context
+        self.config = config
+        self.threads = threads
+        self.timeout = timeout
+        self.process = None
+        self.conn = None
+        self.block = None
+
+    def start(self):
+        self.conn, child = self.context.Pipe()
+        self.process = self.context.Process(
+            target=_serve, args=(child, self.config, self.threads), daemon=True
+        )
+        self.process.start()
+        child.close()  # so recv() raises EOFError if the worker dies
+
+    def wait_ready(self):
+        """Block until the model is loaded; returns an error message or None."""
+        try:
+            status, error = self._receive(LOAD_TIMEOUT)
+        except EOFError:
+            return "the worker exited while loading"
+        except TimeoutError:
+            return f"the worker didn't load the model within {LOAD_TIMEOUT} s"
+        return None if status == "ready" else error
+
+    def _receive(self, timeout):
+        if not self.conn.poll(timeout):
+            self.process.kill()  # hung; a late reply must not answer the next request
+            raise TimeoutError(f"no reply from the ASR worker within {timeout:.0f} s")
+        return self.conn.recv()
+
+    def call(self, method, audio_data, prompt):
+        if isinstance(audio_data, (str, list)):
+            request = (method, audio_data, None, prompt)
+        else:
+            audio = np.asarray(audio_data, dtype=np.float32).ravel()
+            self._reserve(audio.nbytes)
+            np.ndarray(audio.shape, dtype=np.float32, buffer=self.block.buf)[:] = audio
+            request = (method, self.block.name, len(audio), prompt)
+        self.conn.send(request)
+        clips = len(audio_data) if isinstance(audio_data, list) else 1
+        return self._receive(self.timeout * clips)
+
+    def _reserve(self, nbytes):
+        if self.block is None or self.block.size < nbytes:
+            self._release()
+            self.block = shared_memory.SharedMemory(
+                create=True, size=max(nbytes, MIN_BLOCK_BYTES)
+            )
+
+    def _release(self):
+        if self.block is not None:
+            self.block.close()
+            self.block.unlink()
+            self.block = None
+
+    def stop(self):
+        if self.process is not None:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass  # already dead
+            self.process.join(timeout=2)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.conn.close()
+        self._release()
+
+
+class ASRWorker:
+    """SpeechRecognizer that decodes in persistent worker processes.
+
+    Each worker loads the model once and decodes one clip at a time, so
+    Whisper never competes with the UI and audio callback for the GIL and
+    torch stays out of the main process. Clips are copied into a shared
+    memory block owned by the worker instead of being pickled; only the
+    block name, the length and the prompt go over the pipe. A worker that
+    crashes fails the request it was decoding and is restarted in the
+    background, as is one that doesn't answer within `worker_timeout`
+    seconds per clip.
+    """
+
+    def __init__(self, config, workers=1):
+        self.config = config
+        self.size = max(1, workers)
+        self._context = multiprocessing.get_context("spawn")  # no forked pygame or threads
+        self._prompts = SpeechRecognizer(config)  # builds prompts; never loads a model
+        self._idle = queue.Queue()
+        self._workers = []
+        self._live = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def load_model(self):
+        threads = self.config.get_value("whisper", "threads", 0)
+        if not threads and self.size > 1:
+            threads = max(1, (os.cpu_count() or 1) // self.size)  # don't oversubscribe
+        timeout = self.config.get_value("whisper", "worker_timeout", 120)
+        self._workers = [
+            _Worker(self._context, self.config, threads, timeout) for _ in range(self.size)
+        ]
+        for worker in self._workers:
+            worker.start()  # load in parallel
+        for worker in self._workers:
+            error = worker.wait_ready()
+            if error:
+                print(f"Error loading Whisper model: {error}")
+            else:
+                self._live += 1
+                self._idle.put(worker)
+        if self._live < self.size:
+            self.close()
+            return False
+        return True
+
+    def warm_up(self):
+        """Nothing to do; each worker warms up right after loading."""
+
+    def set_vocabulary(self, documents):
+        return self._prompts.set_vocabulary(documents)
+
+    def _restart(self, worker):
+        worker.stop()
+        for attempt in range(3):
+            if self._closed:
+                return
+            worker.start()
+            error = worker.wait_ready()
+            if error is None:
+                self._idle.put(worker)
+                print(f"Restarted ASR worker (pid {worker.process.pid}).")
+                return
+            worker.stop()
+            time.sleep(2**attempt)
+        print(f"Giving up on ASR worker: {error}")
+        with self._lock:
+            self._live -= 1
+
+    def _call(self, method, audio_data, initial_prompt, cancelled=None):
+        while True:
+            if self._closed or not self._live:
+                raise RuntimeError("No ASR worker is running")
+            try:
+                worker = self._idle.get(timeout=1.0)
+                break
+            except queue.Empty:
+                continue  # all busy or restarting
+        if cancelled is not None and cancelled():
+            self._idle.put(worker)
+            return None  # went stale while waiting for a worker
+        prompt = self._prompts.prompt(initial_prompt)
+        try:
+            with tracer.span("transcribe"):
+                result = worker.call(method, audio_data, prompt)
+        except (EOFError, OSError):
+            print(f"ASR worker (pid {worker.process.pid}) died; restarting it.")
+            threading.Thread(target=self._restart, args=(worker,), daemon=True).start()
+            raise RuntimeError("The ASR worker crashed")
+        except TimeoutError as e:
+            print(f"ASR worker (pid {worker.process.pid}) hung; restarting it.")
+            threading.Thread(target=self._restart, args=(worker,), daemon=True).start()
+            raise RuntimeError(str(e))
+        self._idle.put(worker)
+        return result
+
+    def transcribe(self, audio_data, initial_prompt=None):
+        try:
+            return self._call("transcribe", audio_data, initial_prompt)
+        except RuntimeError as e:
+            print(f"Error during transcription: {e}")
+            return f"Error: {str(e)}"
+
+    def transcribe_words(self, audio_data, initial_prompt=None, cancelled=None):
+        """See SpeechRecognizer.transcribe_words; a decode already sent to a
+        worker can't be cancelled."""
+        try:
+            return self._call("transcribe_words", audio_data, initial_prompt, cancelled)
+        except RuntimeError as e:
+            print(f"Error during transcription: {e}")
+            return None
+
+    def transcribe_batch(self, clips, initial_prompt=None):
+        """See SpeechRecognizer.transcribe_batch; the whole batch goes to one
+        worker. Clips are sent as they are, so pass file paths rather than
+        arrays to keep the pipe small."""
+        try:
+            return self._call("transcribe_batch", list(clips), initial_prompt)
+        except RuntimeError as e:
+            print(f"Error during transcription: {e}")
+            return [f"Error: {str(e)}"] * len(clips)
+
+    def close(self):
+        self._closed = True
+        for worker in self._workers:
+            worker.stop()
+        self._workers = []
+        self._live = 0
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import numpy as np
+
+# Words that don't change what is being asked; every other word must match
+# for two questions to share an answer.
+_FILLER = set(
+    """a an the is are was were be do does did i me my we our you your it its this
+    that what when where which who whom how why time times at on in of for to from
+    with by about can could would should will shall please tell know have has had
+    there any some and or next class classes lesson lessons lecture lectures
+    session sessions""".split()
+)
+
+
+def key_terms(question) -> frozenset:
+    """Content words of `question`: days, times, course and room names and the like."""
+    words = re.findall(r"[a-z0-9]+(?::[0-9]+)?", question.lower())
+    words = [w[:-1] if len(w) > 3 and w.endswith("s") else w for w in words]
+    return frozenset(w for w in words if len(w) > 1 or w.isdigit()) - _FILLER
+
+
+class AnswerCache:
+    """Spoken answers remembered by the embedding of the question.
+
+    A lookup returns the answer of the most similar cached question if the
+    cosine similarity reaches `threshold` and both questions have the same
+    key terms: "maths on Monday" and "maths on Tuesday" embed almost
+    identically but must not share an answer. Every entry carries the
+    fingerprint it was answered under (ingested documents, model, prompt);
+    entries with a different fingerprint are never served and are purged
+    when the fingerprint changes. Entries expire after `ttl` seconds and the
+    least recently used ones are evicted beyond `max_entries`. Stored in
+    SQLite and loaded into memory on start.
+    """
+
+    def __init__(self, path, threshold=0.92, ttl=86400.0, max_entries=256):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "question TEXT PRIMARY KEY, fingerprint TEXT, segments TEXT, "
+            "vector BLOB, created REAL, used REAL)"
+        )
+        self._db.commit()
+        self.entries = {}  # question -> [fingerprint, segments, vector, created, used]
+        for question, fingerprint, segments, blob, created, used in self._db.execute(
+            "SELECT * FROM answers"
+        ):
+            vector = np.frombuffer(blob, dtype=np.float32)
+            self.entries[question] = [fingerprint, json.loads(segments), vector, created, used]
+
+    @staticmethod
+    def fingerprint(*parts) -> str:
+        """Hash everything an answer depends on into one key."""
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def lookup(self, embedding, fingerprint, question) -> list[str] | None:
+        """Return the cached answer segments for a similar question, or None."""
+        query = self._normalize(embedding)
+        terms = key_terms(question)
+        now = time.time()
+        with self._lock:
+            self._purge(fingerprint, now)
+            best, best_score = None, self.threshold
+            for cached, (_, _, vector, _, _) in self.entries.items():
+                if len(vector) != len(query):
+                    continue
+                score = float(vector @ query)
+                if score >= best_score and key_terms(cached) == terms:
+                    best, best_score = cached, score
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry = self.entries[best]
+            entry[4] = now
+            self._db.execute("UPDATE answers SET used = ? WHERE question = ?", (now, best))
+            self._db.commit()
+            return list(entry[1])
+
+    def store(self, question, embedding, fingerprint, segments):
+        if not segments:
+            return
+        vector = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            self.entries[question] = [fingerprint, list(segments), vector, now, now]
+            self._db.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?)",
+                (question, fingerprint, json.dumps(segments), vector.tobytes(), now, now),
+            )
+            self._purge(fingerprint, now)
+
+    def _purge(self, fingerprint, now):
+        """Drop stale, expired and least recently used entries."""
+        doomed = [
+            question
+            for question, (entry_fingerprint, _, _, created, _) in self.entries.items()
+            if entry_fingerprint != fingerprint or now - created > self.ttl
+        ]
+        excess = len(self.entries) - len(doomed) - self.max_entries
+        if excess > 0:
+            live = sorted(
+                (entry[4], question)
+                for question, entry in self.entries.items()
+                if question not in doomed
+            )
+            doomed += [question for _, question in live[:excess]]
+        for question in doomed:
+            del self.entries[question]
+        if doomed:
+            self._db.executemany(
+                "DELETE FROM answers WHERE question = ?", [(q,) for q in doomed]
+            )
+        self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
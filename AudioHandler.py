@@ -1,34 +1,77 @@
-import sounddevice as sd
 import numpy as np
 
+from VoiceActivityDetector import VoiceActivityDetector
+
 AUDIO_CONFIG = {
     "CHANNELS": 1,
     "RATE": 16000,
     "CHUNK": 512,  # Reduced chunk size for lower latency
+    "MAX_CLIP_SECONDS": 120,
 }
 
+INT16_SCALE = np.float32(1.0 / 32768.0)
+
 
 class AudioHandler:
-    """Handles audio recording using sounddevice"""
+    """Handles audio recording using sounddevice
 
-    def __init__(self):
-        self.frames = []
-        self.latest_frame = None
+    Samples are written into a preallocated int16 ring buffer holding the
+    last `max_clip_seconds` of audio, so the PortAudio callback never
+    allocates. Sample positions are absolute since `start_recording`;
+    sample `i` lives at `ring[i % capacity]`.
+    """
+
+    def __init__(self, config=None):
         self.stream = None
         self.dtype = "int16"
         self.channels = AUDIO_CONFIG["CHANNELS"]
         self.rate = AUDIO_CONFIG["RATE"]
         self.chunk = AUDIO_CONFIG["CHUNK"]
+        max_clip_seconds = AUDIO_CONFIG["MAX_CLIP_SECONDS"]
+        if config is not None:
+            max_clip_seconds = config.get_value("audio", "max_clip_seconds", max_clip_seconds)
+        blocks = max(1, int(max_clip_seconds * self.rate) // self.chunk)
+        self.capacity = blocks * self.chunk
+        self.ring = np.zeros(self.capacity, dtype=np.int16)
+        self.clip = np.zeros(self.capacity, dtype=np.float32)
+        self.frame = np.zeros(self.chunk, dtype=np.float32)
+        self.num_samples = 0
+        self.latest_start = None
+        self.latest_end = None
+        self.vad = None
+        self.hands_free = False
+        if config is not None and config.get_value("vad", "enabled", True):
+            self.vad = VoiceActivityDetector(config, self.rate, self.chunk, blocks)
+            self.hands_free = config.get_value("vad", "hands_free", False)
+        self.speech_bounds = None
+        self.last_stats = {}
 
     def callback(self, indata, frames, time, status):
         if status:
             print(status)
-        self.frames.append(indata.copy())
-        self.latest_frame = indata.copy()
+        start = self.num_samples
+        pos = start % self.capacity
+        first = min(frames, self.capacity - pos)
+        self.ring[pos : pos + first] = indata[:first, 0]
+        if first < frames:
+            self.ring[: frames - first] = indata[first:, 0]
+        self.num_samples = start + frames
+        self.latest_start, self.latest_end = start, start + frames
+        if self.vad:
+            self.vad.process(indata[:, 0])
+
+    def reset(self):
+        """Forget the previous clip; `callback` can then be fed directly."""
+        self.num_samples = 0
+        self.latest_start = self.latest_end = None
+        self.speech_bounds = None
+        if self.vad:
+            self.vad.reset()
 
     def start_recording(self):
-        self.frames = []
-        self.latest_frame = None
+        import sounddevice as sd  # PortAudio is only needed for the microphone
+
+        self.reset()
         self.stream = sd.InputStream(
             samplerate=self.rate,
             channels=self.channels,
@@ -38,23 +81,93 @@ class AudioHandler:
         )
         self.stream.start()
 
+    def _clamp(self, start, end):
+        total = self.num_samples
+        end = total if end is None else min(end, total)
+        start = max(start, total - self.capacity, 0)
+        return start, end
+
+    def views(self, start=0, end=None):
+        """Return zero-copy int16 views covering samples [start, end).
+
+        One view normally, two when the range wraps around the ring.
+        Samples older than the ring capacity are no longer available and
+        the range is clamped to what is.
+        """
+        start, end = self._clamp(start, end)
+        if start >= end:
+            return []
+        pos = start % self.capacity
+        length = end - start
+        if pos + length <= self.capacity:
+            return [self.ring[pos : pos + length]]
+        return [self.ring[pos:], self.ring[: pos + length - self.capacity]]
+
+    def latest_view(self):
+        if self.latest_start is None:
+            return None
+        views = self.views(self.latest_start, self.latest_end)
+        return views[0] if len(views) == 1 else None
+
     def process_frame(self):
-        if self.latest_frame is not None:
-            return self.latest_frame.flatten().astype(np.float32) / 32768.0
+        latest = self.latest_view()
+        if latest is None or len(latest) != self.chunk:
+            self.frame.fill(0.0)
         else:
-            return np.zeros(self.chunk, dtype=np.float32)
+            np.multiply(latest, INT16_SCALE, out=self.frame)
+        return self.frame
+
+    def _to_float(self, views, out):
+        offset = 0
+        for view in views:
+            np.multiply(view, INT16_SCALE, out=out[offset : offset + len(view)])
+            offset += len(view)
+        return out[:offset]
+
+    def get_audio(self, start=0, end=None):
+        """Return samples [start, end) recorded so far as a new float32 array.
+
+        Safe to call from another thread while the stream is running.
+        """
+        views = self.views(start, end)
+        out = np.empty(sum(len(v) for v in views), dtype=np.float32)
+        return self._to_float(views, out)
+
+    @property
+    def endpoint_detected(self):
+        """True when hands-free mode has heard speech followed by silence,
+        or has heard no speech at all for too long."""
+        return (
+            self.hands_free
+            and self.vad is not None
+            and (self.vad.endpoint_reached or self.vad.timed_out)
+        )
 
     def stop_recording(self):
+        """Stop the stream and return the recorded clip.
+
+        With VAD enabled the clip is trimmed to the detected speech and is
+        empty when no speech was heard; `speech_bounds` and `last_stats`
+        describe the trim. The returned array is a view of a preallocated
+        float32 buffer and stays valid until the next `stop_recording`.
+        """
         if self.stream:
             self.stream.stop()
             self.stream.close()
             self.stream = None
-        if not self.frames:
-            return np.zeros(0, dtype=np.float32)
-        audio_data = np.concatenate(self.frames, axis=0).flatten()
-        audio_data = audio_data.astype(np.float32) / 32768.0
-        self.frames = []
-        return audio_data
+        start, end = self._clamp(0, None)
+        if start >= end:
+            return self.clip[:0]
+        if self.vad:
+            self.speech_bounds = self.vad.speech_bounds()
+            self.last_stats = self.vad.stats(end - start)
+            if self.speech_bounds is None:
+                return self.clip[:0]
+        elif end - start < self.rate * 0.5:
+            return self.clip[:0]
+        else:
+            self.speech_bounds = (start, end)
+        return self._to_float(self.views(*self.speech_bounds), self.clip)
 
     def cleanup(self):
         if self.stream:
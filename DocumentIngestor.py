@@ -0,0 +1,169 @@
+import hashlib
+import os
+
+from rag.embedder import content_hash
+from rag.ocr import IMAGE_EXTENSIONS
+from rag.rag import iter_chunks, iter_document, read_txtd
+
+
+def chunk_id(prefix: str, chunk: str, seen: dict[str, int]) -> str:
+    """Stable id derived from the chunk text, so unchanged chunks keep theirs.
+
+    `seen` counts repeats of the same text within one source.
+    """
+    digest = content_hash(chunk)[:16]
+    n = seen.get(digest, 0)
+    seen[digest] = n + 1
+    return f"{prefix}:{digest}:{n}"
+
+
+class DocumentIngestor:
+    """Keeps the vector store in sync with ingested documents.
+
+    Each source is streamed page by page through the chunker and its chunk
+    ids are compared with those recorded in the registry, so only new chunks
+    are embedded and upserted and only vanished ones are deleted. Kept
+    chunks that moved get their offsets updated without re-embedding. Several
+    documents coexist in the collection, each tagged with its `source` path.
+    """
+
+    def __init__(
+        self,
+        vector_store,
+        embedder,
+        registry,
+        status=print,
+        batch_size=64,
+        pdf_workers=None,
+        chunk_tokens=200,
+        chunk_overlap=40,
+        ocr=None,
+    ):
+        self.vector_store = vector_store
+        self.embedder = embedder
+        self.registry = registry
+        self.status = status
+        self.batch_size = batch_size
+        self.pdf_workers = pdf_workers
+        self.chunk_tokens = chunk_tokens
+        self.chunk_overlap = chunk_overlap
+        self.ocr = ocr
+
+    def ingest_file(self, path: str) -> str:
+        path = os.path.abspath(path)
+        mtime = os.path.getmtime(path)
+        record = self.registry.get(path)
+        if record and record["mtime"] == mtime:
+            return f"{os.path.basename(path)} is already up to date."
+        pages = iter_document(path, self.pdf_workers, self.ocr)
+        if pages is None:
+            return "Selected file is not supported."
+        return self._ingest_pages(path, pages, mtime)
+
+    def ingest_text(self, source: str, text: str, mtime: float = 0.0) -> str:
+        record = self.registry.get(source)
+        if record and record["hash"] == content_hash(text):
+            return f"{os.path.basename(source)} is already up to date."
+        return self._ingest_pages(source, [(None, text)], mtime)
+
+    def _ingest_pages(self, source: str, pages, mtime: float) -> str:
+        """Stream pages through the chunker and embed new chunks in batches.
+
+        Only the current batch of chunks is held in memory; the content hash
+        is computed incrementally alongside.
+        """
+        name = os.path.basename(source)
+        record = self.registry.get(source)
+        old_ids = set(record["chunks"]) if record else set()
+        old_metadata = {}
+        if old_ids:
+            stored = self.vector_store.get(ids=sorted(old_ids), include=("metadatas",))
+            old_metadata = dict(zip(stored["ids"], stored["metadatas"]))
+        if record is None:
+            # Drop chunks written before this source was tracked.
+            self.vector_store.delete(where={"source": source})
+
+        hasher = hashlib.sha256()
+
+        def hashed(pages):
+            for page, text in pages:
+                hasher.update(text.encode("utf-8"))
+                yield page, text
+
+        prefix = content_hash(source)[:12]
+        seen: dict[str, int] = {}
+        ids: list[str] = []
+        batch = []
+        moved = []
+        added = 0
+        chunks = iter_chunks(hashed(pages), self.chunk_tokens, self.chunk_overlap)
+        for chunk in chunks:
+            id_ = chunk_id(prefix, chunk.text, seen)
+            ids.append(id_)
+            if id_ not in old_ids:
+                batch.append((id_, chunk))
+            elif old_metadata.get(id_) != self._metadata(source, chunk):
+                moved.append((id_, self._metadata(source, chunk)))
+            if len(batch) >= self.batch_size:
+                added += self._write_batch(source, batch)
+                self.status(f"{name}: {len(ids)} chunks read, {added} new")
+                batch = []
+        added += self._write_batch(source, batch)
+        self.vector_store.update([id_ for id_, _ in moved], [m for _, m in moved])
+
+        if not ids:
+            return f"No text found in {name}."
+        stale = sorted(old_ids - set(ids))
+        self.vector_store.delete(stale)
+        self.registry.update(source, mtime, hasher.hexdigest(), ids)
+        if not added and not stale and not moved:
+            return f"{name} is already up to date."
+        summary = f"{name}: {added} chunks added, {len(stale)} removed"
+        return f"{summary}, {len(moved)} moved." if moved else f"{summary}."
+
+    @staticmethod
+    def _metadata(source, chunk) -> dict:
+        metadata = {"source": source, "start": chunk.start, "end": chunk.end}
+        if chunk.page is not None:
+            metadata["page"] = chunk.page
+        return metadata
+
+    def _write_batch(self, source, batch) -> int:
+        if not batch:
+            return 0
+        ids = [id_ for id_, _ in batch]
+        documents = [chunk.text for _, chunk in batch]
+        metadatas = [self._metadata(source, chunk) for _, chunk in batch]
+        embeds = self.embedder.embed(documents)
+        self.vector_store.upsert(ids, documents, embeds, metadatas)
+        return len(batch)
+
+    def ingest_directory(self, path: str) -> str:
+        """Ingest every document in a folder and drop files that disappeared."""
+        path = os.path.abspath(path)
+        texts = read_txtd(path)
+        summaries = []
+        for filename in sorted(texts):
+            source = os.path.join(path, filename)
+            summaries.append(
+                self.ingest_text(source, texts[filename], os.path.getmtime(source))
+            )
+        for filename in sorted(os.listdir(path)):
+            if filename.endswith(".pdf") or (
+                self.ocr is not None and filename.lower().endswith(IMAGE_EXTENSIONS)
+            ):
+                summaries.append(self.ingest_file(os.path.join(path, filename)))
+        for source in self.registry.sources():
+            if os.path.dirname(source) == path and not os.path.exists(source):
+                summaries.append(self.remove_source(source))
+        for summary in summaries:
+            self.status(summary)
+        return f"Processed {len(summaries)} documents from {os.path.basename(path)}."
+
+    def remove_source(self, source: str) -> str:
+        record = self.registry.get(source)
+        if record:
+            self.vector_store.delete(record["chunks"])
+        self.vector_store.delete(where={"source": source})
+        self.registry.remove(source)
+        return f"Removed {os.path.basename(source)}."
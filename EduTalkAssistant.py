@@ -3,29 +3,29 @@ from EduTalkUI import EduTalkUI
 # from ConfigLoader import ConfigLoader
 from AudioHandler import AudioHandler
 from SpeechRecognizer import SpeechRecognizer
+from ASRWorker import ASRWorker
+from StreamingTranscriber import StreamingTranscriber
 from OllamaConnector import OllamaConnector
 from TextToSpeech import TextToSpeech
+from SpeechPipeline import SpeechPipeline
+from TaskRunner import TaskRunner, TASK_EVENT
+from Tracer import tracer
 
 from ConfigParser import ConfigParser
+from VectorStore import create_vector_store
+from Retriever import Retriever
+from AnswerCache import AnswerCache
 
-import chromadb
-from rag.rag import (
-    EMBED_MODEL,
-    read_txtf,
-    read_pdf,
-    read_png,
-    chunk_splitter,
-    get_embedding,
-)
+from DocumentIngestor import DocumentIngestor
+from rag.rag import EMBED_MODEL
+from rag.embedder import Embedder
+from rag.ocr import OCRPool
+from rag.registry import DocumentRegistry
 
+import os
 import time
-import requests
-import re
-import threading
+from enum import Enum
 import pygame
-import tkinter as tk
-from tkinter import filedialog
-import ollama
 
 CONFIG_FILEPATH = "config.toml"
 
@@ -36,213 +36,487 @@ AUDIO_CONFIG: dict[str, int] = {
 }
 
 
+class AssistantState(Enum):
+    LOADING = "loading"
+    IDLE = "idle"
+    RECORDING = "recording"
+    TRANSCRIBING = "transcribing"
+    RETRIEVING = "retrieving"
+    GENERATING = "generating"
+    SPEAKING = "speaking"
+    INGESTING = "ingesting"
+
+
 # Main Assistant Class
 class EduTalkAssistant:
     """Main class coordinating all components"""
 
-    def __init__(self, config_path=None):
+    def __init__(self, config_path=None, started_at=None):
+        self.started_at = started_at or time.perf_counter()
         self.config = ConfigParser(CONFIG_FILEPATH)
         self.config.read_config()
-        self.audio_handler = AudioHandler()
+        tracer.configure(self.config)
+        self.audio_handler = AudioHandler(self.config)
         self.ui = EduTalkUI(self.config, self.status_update, self)
-        self.speech_recognizer = SpeechRecognizer(self.config)
+        if self.config.get_value("whisper", "out_of_process", False):
+            self.speech_recognizer = ASRWorker(self.config)
+        else:
+            self.speech_recognizer = SpeechRecognizer(self.config)
         self.ollama = OllamaConnector(self.config)
         self.tts = TextToSpeech(self.config)
+        self.vector_store = create_vector_store(self.config)
+        self.embedder = Embedder(
+            EMBED_MODEL,
+            batch_size=self.config.get_value("embedding", "batch_size", 32),
+            workers=self.config.get_value("embedding", "workers", 2),
+            cache_path=self.config.get_value("embedding", "cache_path"),
+            host=self.ollama.base_url,
+        )
+        self.ocr = None
+        if self.config.get_value("ocr", "enabled", True):
+            self.ocr = OCRPool(
+                self.config.get_value("ocr", "languages", ["en"]),
+                workers=self.config.get_value("ocr", "workers", 2),
+                cache_path=self.config.get_value("ocr", "cache_path", ".revira/ocr.sqlite"),
+            )
+        self.ingestor = DocumentIngestor(
+            self.vector_store,
+            self.embedder,
+            DocumentRegistry(
+                self.config.get_value(
+                    "vectorstore", "registry_path", ".revira/documents.json"
+                )
+            ),
+            status=self.status_update,
+            batch_size=self.config.get_value("ingest", "batch_size", 64),
+            pdf_workers=self.config.get_value("ingest", "pdf_workers"),
+            chunk_tokens=self.config.get_value("ingest", "chunk_tokens", 200),
+            chunk_overlap=self.config.get_value("ingest", "chunk_overlap", 40),
+            ocr=self.ocr,
+        )
+        self.retriever = Retriever(self.vector_store, self.embedder, self.config)
+        self.answer_cache = None
+        if self.config.get_value("answer_cache", "enabled", True):
+            self.answer_cache = AnswerCache(
+                self.config.get_value("answer_cache", "path", ".revira/answers.sqlite"),
+                threshold=self.config.get_value("answer_cache", "threshold", 0.92),
+                ttl=3600 * self.config.get_value("answer_cache", "ttl_hours", 24),
+                max_entries=self.config.get_value("answer_cache", "max_entries", 256),
+            )
         self.flashcards = []
         self.is_running = True
-        self.is_recording = False
-        self.speech_thread = None
+        self.state = AssistantState.LOADING
+        self.turn = 0
+        self.tasks = TaskRunner()
+        # Generation and playback block until the answer has been spoken, so
+        # they get their own worker and never hold up the next transcription.
+        self.speech_tasks = TaskRunner()
+        self.startup = None
+        self.startup_pending = set()
+        self.startup_times = {}
+        self.startup_errors = {}
+        self.pipeline = None
+        self.streamer = None
         self.has_shutdown = False
-        self.tt_data = "No timetable data."
 
     def status_update(self, message):
         print(f"\t:> {message}")
 
     def initialize(self):
-        self.ui.display_message("Loading speech recognition model...")
+        """Start loading models in the background; the window is already up.
+
+        Whisper, the Ollama health check and the document index load
+        concurrently, each reporting back with a "started" task event.
+        """
+        self.startup_times["window"] = time.perf_counter() - self.started_at
+        steps = {
+            "speech model": self.load_speech_model,
+            "language model": self.load_language_model,
+            "documents": self.load_documents,
+        }
+        self.startup_pending = set(steps)
+        self.startup = TaskRunner(workers=len(steps))
+        for name, step in steps.items():
+            self.startup.submit("started", self.turn, self.timed_step, name, step)
+        self.set_state(AssistantState.LOADING)
+        self.show_startup_progress()
+        return True
+
+    def load_speech_model(self):
         if not self.speech_recognizer.load_model():
-            self.ui.display_message(self.config.get_value("messages", "error_model"))
-            time.sleep(3)
-            return False
+            raise RuntimeError(self.config.get_value("messages", "error_model"))
+        if self.config.get_value("startup", "warm_up", True):
+            self.speech_recognizer.warm_up()
+
+    def load_language_model(self):
+        if not self.ollama.check_health():
+            raise RuntimeError(self.config.get_value("messages", "error_api"))
+        if self.config.get_value("startup", "warm_up", True):
+            self.ollama.preload()
+
+    def load_documents(self):
+        self.retriever.warm_up()
+        self.speech_recognizer.set_vocabulary(self.retriever.documents())
+        if self.config.get_value("startup", "warm_up", True):
+            self.embedder.warm_up()
+
+    def timed_step(self, name, step):
+        """Run a startup step, returning (name, seconds, error or None)."""
+        start = time.perf_counter()
         try:
-            self.ui.display_message("Testing connection to language model...")
-            requests.get(
-                self.config.get_value("ollama", "url").replace("/generate", "/"),
-                timeout=2,
-            )
+            step()
         except Exception as e:
-            print(e)
-            self.ui.display_message(self.config.get_value("messages", "error_api"))
-            time.sleep(3)
-            return False
-        self.ui.display_message(self.config.get_value("messages", "ready"))
-        return True
+            print(f"Startup step '{name}' failed: {e}")
+            return name, time.perf_counter() - start, e
+        return name, time.perf_counter() - start, None
+
+    def show_startup_progress(self):
+        done = len(self.startup_times) - 1  # minus the window itself
+        total = done + len(self.startup_pending)
+        self.ui.display_message(
+            f"{self.config.get_value('messages', 'loading')} ({done}/{total})"
+        )
+
+    def finish_startup(self, name, elapsed, error):
+        self.startup_pending.discard(name)
+        self.startup_times[name] = elapsed
+        if error:
+            self.startup_errors[name] = error
+        if self.startup_pending:
+            self.show_startup_progress()
+            return
+        self.startup.stop()
+        report = ", ".join(f"{step} {t:.2f} s" for step, t in self.startup_times.items())
+        total = time.perf_counter() - self.started_at
+        print(f"Startup: {report}; ready after {total:.2f} s")
+        for step in ("speech model", "language model"):
+            if step in self.startup_errors:
+                # Stay in LOADING: nothing can be answered without the model.
+                self.ui.display_message(str(self.startup_errors[step]))
+                return
+        self.finish_turn()
+
+    def set_state(self, state):
+        if state != self.state:
+            self.status_update(f"state: {self.state.value} -> {state.value}")
+        self.state = state
+        self.ui.set_recording(state == AssistantState.RECORDING)
+        self.ui.set_speaking(
+            state in (AssistantState.GENERATING, AssistantState.SPEAKING)
+        )
+        self.ui.set_busy(
+            state
+            in (
+                AssistantState.LOADING,
+                AssistantState.TRANSCRIBING,
+                AssistantState.RETRIEVING,
+                AssistantState.INGESTING,
+            )
+        )
+
+    def finish_turn(self, message=None, outcome=None):
+        """Return to idle, optionally flashing a message before "ready"."""
+        tracer.end(outcome or message or "done")
+        self.set_state(AssistantState.IDLE)
+        ready = self.config.get_value("messages", "ready")
+        if message:
+            self.ui.display_message(message, duration=2, then=ready)
+        else:
+            self.ui.display_message(ready)
 
     def start_recording(self):
-        if not self.is_recording:
-            self.is_recording = True
-            self.ui.set_recording(True)
+        if self.state == AssistantState.IDLE:
+            self.turn += 1
+            self.set_state(AssistantState.RECORDING)
             self.audio_handler.start_recording()
+            if self.config.get_value("whisper", "streaming", False):
+                self.streamer = StreamingTranscriber(
+                    self.speech_recognizer, self.audio_handler, self.config
+                )
+                self.streamer.start()
 
     def stop_recording(self):
-        if self.is_recording:
-            self.is_recording = False
-            self.ui.set_recording(False)
-            self.ui.display_message(self.config.get_value("messages", "processing"))
+        if self.state != AssistantState.RECORDING:
+            return
+        tracer.begin(self.turn)
+        with tracer.span("stop_audio"):
             audio_data = self.audio_handler.stop_recording()
+        streamer, self.streamer = self.streamer, None
 
-            if len(audio_data) < AUDIO_CONFIG["RATE"] * 0.5:
-                self.ui.display_message(self.config.get_value("messages", "no_audio"))
-                time.sleep(1)
-                self.ui.display_message(self.config.get_value("messages", "ready"))
-                return
+        if self.audio_handler.last_stats:
+            stats = self.audio_handler.last_stats
+            self.status_update(
+                f"speech ratio {stats['speech_ratio']:.2f}, "
+                f"trimmed {stats['trimmed_ms']} ms"
+            )
 
-            self.ui.display_message(self.config.get_value("messages", "processing"))
-            transcription = self.speech_recognizer.transcribe(audio_data)
-            # DEBUG
-            # print(f"Transcription result: '{transcription}'")
-            if not transcription or transcription.startswith("Error:"):
-                self.ui.display_message("Couldn't understand audio")
-                time.sleep(2)
-                self.ui.display_message(self.config.get_value("messages", "ready"))
-                return
+        if len(audio_data) == 0:
+            if streamer:
+                streamer.cancel()
+            self.finish_turn(self.config.get_value("messages", "no_audio"))
+            return
+
+        self.set_state(AssistantState.TRANSCRIBING)
+        self.ui.display_message(self.config.get_value("messages", "processing"))
+        if streamer:
+            self.tasks.submit(
+                "transcribed", self.turn, streamer.finish, self.audio_handler.speech_bounds[1]
+            )
+        else:
+            self.tasks.submit(
+                "transcribed", self.turn, self.speech_recognizer.transcribe, audio_data
+            )
+
+    def cancel_recording(self):
+        if self.state != AssistantState.RECORDING:
+            return
+        self.audio_handler.stop_recording()
+        streamer, self.streamer = self.streamer, None
+        if streamer:
+            streamer.cancel()
+        self.finish_turn()
+
+    def answer_fingerprint(self):
+        """Everything a cached answer depends on besides the question."""
+        return AnswerCache.fingerprint(
+            self.ingestor.registry.fingerprint(),
+            self.config.get_value("ollama", "model"),
+            self.config.get_value("conversation", "system_prompt"),
+            EMBED_MODEL,
+        )
+
+    def prepare_answer(self, transcription):
+        """Look the question up in the answer cache, else build the prompt."""
+        with tracer.span("embed_query"):
+            embedding = self.embedder.embed_query(transcription)
+        fingerprint = self.answer_fingerprint() if self.answer_cache else None
+        if self.answer_cache:
+            with tracer.span("answer_cache"):
+                segments = self.answer_cache.lookup(embedding, fingerprint, transcription)
+            tracer.set("cache_hit", bool(segments))
+            rate = 100 * self.answer_cache.hit_rate
+            print(f"Answer cache {'hit' if segments else 'miss'} ({rate:.0f}% hit rate)")
+            if segments:
+                return {"segments": segments}
+        return {
+            "prompt": self.build_prompt(transcription, embedding),
+            "question": transcription,
+            "embedding": embedding,
+            "fingerprint": fingerprint,
+        }
+
+    def build_prompt(self, transcription, embedding=None):
+        """Retrieve timetable context for the question and fill in the prompt."""
+        prompt, hits = self.retriever.build_prompt(transcription, embedding)
+        print(f"Retrieval: {len(hits)} chunks, {self.retriever.timing_summary()}")
+        return prompt
 
-            chromaclient = chromadb.HttpClient(host="localhost", port=8000)
-            collection = chromaclient.get_or_create_collection(name="user_tt")
+    def start_pipeline(self):
+        turn = self.turn
+        self.pipeline = SpeechPipeline(
+            self.tts,
+            workers=self.config.get_value("tts", "synth_workers", 2),
+            queue_size=self.config.get_value("tts", "queue_size", 4),
+            on_segment=lambda text: self.tasks.notify("segment", turn, result=text),
+        )
+        self.pipeline.start()
+        return self.pipeline
 
-            queryembed = ollama.embed(model=EMBED_MODEL, input=transcription)[
-                "embeddings"
-            ]
+    def generate_response(self, user_input, question=None, embedding=None, fingerprint=None):
+        """Generates a response using the Ollama API.
 
-            self.tt_data = "\n\n".join(
-                collection.query(query_embeddings=queryembed, n_results=10)[
-                    "documents"
-                ][0]
+        When the question and its embedding are given, the spoken answer is
+        stored in the answer cache once it has played in full.
+        """
+        pipeline = self.start_pipeline()
+
+        def respond():
+            segments = []
+
+            def speak(segment):
+                segments.append(segment)
+                pipeline.submit(segment)
+
+            full_response = self.ollama.generate_response(
+                user_input, speak, should_stop=pipeline.is_cancelled
             )
-            self.tt_data = "[Timetable data:\n" + self.tt_data + "]" # TODO: improve RAG
-            sys_prompt = self.config.get_value("conversation",  "system_prompt")
-            prompt = sys_prompt.replace("<query>", transcription)
-            prompt = re.sub(r"\[(.*?)\]", self.tt_data, prompt, count=1)
-            self.generate_response(prompt)
-
-    def speak_chunk(self, text_chunk):
-        self.ui.set_speaking(True)
-        self.ui.display_message(text_chunk)
-        self.tts.speak(text_chunk, self.ui.display_waveform)
-
-    def generate_response(self, user_input):
-        """Generates a response using the Ollama API."""
-
-        def response_thread():
-            self.ui.set_speaking(True)
-            full_response = self.ollama.generate_response(user_input, self.speak_chunk)
-            self.ui.set_speaking(False)
-            self.ui.display_message(full_response)
-            time.sleep(1)
-            self.ui.display_message(self.config.get_value("messages", "ready"))
-
-        self.speech_thread = threading.Thread(target=response_thread)
-        self.speech_thread.daemon = True
-        self.speech_thread.start()
+            pipeline.finish()
+            pipeline.wait()
+            if (
+                self.answer_cache
+                and question
+                and self.ollama.last_error is None
+                and not pipeline.is_cancelled()
+            ):
+                self.answer_cache.store(question, embedding, fingerprint, segments)
+            return full_response
+
+        self.set_state(AssistantState.GENERATING)
+        self.speech_tasks.submit("responded", self.turn, respond)
+
+    def speak_cached(self, segments):
+        """Play a cached answer without retrieval or generation."""
+        pipeline = self.start_pipeline()
+
+        def respond():
+            for segment in segments:
+                if pipeline.is_cancelled():
+                    break
+                pipeline.submit(segment)
+            pipeline.finish()
+            pipeline.wait()
+            return " ".join(segments)
+
+        self.set_state(AssistantState.SPEAKING)
+        self.speech_tasks.submit("responded", self.turn, respond)
 
     def stop_speaking(self):
-        if self.ui.is_speaking:
+        if self.state in (AssistantState.GENERATING, AssistantState.SPEAKING):
+            if self.pipeline:
+                self.pipeline.cancel()
             self.tts.stop()
-            self.ui.set_speaking(False)
+            self.turn += 1  # results of the cancelled turn are now stale
+            self.finish_turn(outcome="cancelled")
+
+    def handle_task_event(self, event):
+        """Advance the state machine with a result posted by a background task."""
+        if event.turn != self.turn:
+            return  # cancelled or superseded turn
+        if event.name == "started":
+            self.finish_startup(*event.result)
+            return
+        if event.name == "transcribed":
+            transcription = event.result
+            # DEBUG
+            # print(f"Transcription result: '{transcription}'")
+            if event.error or not transcription or transcription.startswith("Error:"):
+                self.finish_turn("Couldn't understand audio")
+                return
+            self.set_state(AssistantState.RETRIEVING)
+            self.ui.display_message(transcription)
+            self.tasks.submit("retrieved", self.turn, self.prepare_answer, transcription)
+        elif event.name == "retrieved":
+            if event.error:
+                self.finish_turn(f"Couldn't search your documents: {event.error}")
+                return
+            if "segments" in event.result:
+                self.speak_cached(event.result["segments"])
+            else:
+                self.generate_response(
+                    event.result["prompt"],
+                    event.result["question"],
+                    event.result["embedding"],
+                    event.result["fingerprint"],
+                )
+        elif event.name == "segment":
+            self.set_state(AssistantState.SPEAKING)
+            self.ui.display_message(event.result)
+        elif event.name == "responded":
+            tracer.end("answered")
+            self.set_state(AssistantState.IDLE)
+            ready = self.config.get_value("messages", "ready")
+            if event.result:
+                self.ui.display_message(event.result, duration=1, then=ready)
+            else:
+                self.ui.display_message(ready)
+        elif event.name == "ingested":
+            if event.error:
+                self.finish_turn(f"Couldn't ingest file: {event.error}")
+            else:
+                self.finish_turn(event.result)
+
+    def upload_file(self, directory=False):
+        import tkinter as tk  # only needed for the file dialog
+        from tkinter import filedialog
 
-    def upload_file(self):
         root = tk.Tk()
         root.withdraw()  # Hide the main window
-        file_path = filedialog.askopenfilename(title="Select timetable file...")
+        if directory:
+            file_path = filedialog.askdirectory(title="Select course folder...")
+        else:
+            file_path = filedialog.askopenfilename(title="Select timetable file...")
         root.destroy()
         return file_path
 
+    def ingest(self, path, directory=False):
+        ingest = self.ingestor.ingest_directory if directory else self.ingestor.ingest_file
+        message = ingest(path)
+        self.speech_recognizer.set_vocabulary(self.retriever.documents())
+        return message
+
+    def handle_action(self, action):
+        if action == "quit":
+            self.shutdown()
+        elif action == "start_recording":
+            if self.state == AssistantState.RECORDING and self.audio_handler.hands_free:
+                self.stop_recording()  # a second press ends a hands-free recording
+            else:
+                self.start_recording()
+        elif action == "cancel_recording":
+            self.cancel_recording()
+        elif action == "stop_recording":
+            if not self.audio_handler.hands_free:
+                self.stop_recording()
+        elif action == "stop_speaking":
+            self.stop_speaking()
+        elif (
+            action in ("upload_file", "upload_directory")
+            and self.state == AssistantState.IDLE
+        ):
+            directory = action == "upload_directory"
+            print("Upload folder..." if directory else "Upload img/pdf file...")
+            path = self.upload_file(directory)
+            if path:
+                print(f">>>> Selected {'folder' if directory else 'file'}: {path}")
+                self.turn += 1
+                self.set_state(AssistantState.INGESTING)
+                self.ui.display_message(f"Adding {os.path.basename(path)}...")
+                self.tasks.submit("ingested", self.turn, self.ingest, path, directory)
+
     def run(self):
         if not self.initialize():
             return
         while self.is_running:
-            if self.is_recording:
+            if self.state == AssistantState.RECORDING:
                 audio_frame = self.audio_handler.process_frame()
                 self.ui.display_waveform(audio_frame)
-            action = self.ui.update()
-            if action == "quit":
-                self.shutdown()
-                break
-            elif action == "start_recording":
-                self.start_recording()
-            elif action == "stop_recording":
-                self.stop_recording()
-            elif action == "stop_speaking":
-                self.stop_speaking()
-            elif action == "upload_file":
-                print("Upload img/pdf file...")
-                path = self.upload_file()
-                if path:
-                    print(f">>>> Selected file: {path}")
-                    if path:  # TODO: Make a separate function
-                        chromaclient = chromadb.HttpClient(host="localhost", port=8000)
-                        text_content = ""
-                        if path.endswith(".pdf"):
-                            text_content = read_pdf(path)
-                        elif path.endswith(".txt"):
-                            text_content = read_txtf(path)
-                        # elif path.endswith(".png"):
-                        #     text_content = read_png(path)
-                        else:
-                            print(">>>> Selected file is not supported.")
-                            print(">>>>\tSupported filetypes are: PDF, PNG, TXT.")
-
-                        if text_content:
-                            # collection = chromaclient.get_or_create_collection(
-                            #     name="user_tt",
-                            #     metadata={"hnsw:space": "cosine"},
-                            # )
-                            # if any(
-                            #     coll.name == "user_tt"
-                            #     for coll in chromaclient.list_collections()
-                            # ):
-                            #     chromaclient.delete_collection("user_tt")
-                            #     collection = chromaclient.get_or_create_collection(
-                            #         name="user_tt",
-                            #         metadata={"hnsw:space": "cosine"},
-                            #     )
-
-                            collection = chromaclient.get_or_create_collection(
-                                name="user_tt",
-                                metadata={"hnsw:space": "cosine"},
-                            )
-                            try:
-                                chromaclient.get_collection("user_tt")
-                                chromaclient.delete_collection("user_tt")
-                                collection = chromaclient.get_or_create_collection(
-                                    name="user_tt",
-                                    metadata={"hnsw:space": "cosine"},
-                                )
-                            except ValueError:
-                                pass
-
-                            chunks = chunk_splitter(text_content)
-                            embeds = get_embedding(chunks)
-                            chunknumber = list(range(len(chunks)))
-                            ids = [f"tt_{path}_{i}" for i in chunknumber]
-                            metadatas = [{"source": path} for _ in chunknumber]
-
-                            collection.add(
-                                ids=ids,
-                                documents=chunks,
-                                embeddings=embeds,
-                                metadatas=metadatas,
-                            )
-                            print(f"embedding the the file: '{path}' with success.")
+                if self.audio_handler.endpoint_detected:
+                    self.stop_recording()
+            for action in self.ui.update():
+                if isinstance(action, str):
+                    self.handle_action(action)
+                elif action.type == TASK_EVENT:
+                    self.handle_task_event(action)
+                if not self.is_running:
+                    break
 
     def shutdown(self):
         if self.has_shutdown:
             return  # Skip if already shut down
         self.has_shutdown = True  # Mark as shut down
         self.is_running = False
+        if hasattr(self, "tasks"):
+            self.tasks.stop()  # Let background workers exit
+        if hasattr(self, "speech_tasks"):
+            self.speech_tasks.stop()
+        if getattr(self, "startup", None):
+            self.startup.stop()
+        if self.pipeline:
+            self.pipeline.cancel()  # Drop queued speech
         if hasattr(self, "tts"):
             self.tts.stop()  # Stop text-to-speech
         if hasattr(self, "audio_handler"):
             self.audio_handler.cleanup()  # Clean up audio resources
+        if hasattr(self, "ollama"):
+            self.ollama.close()  # Release pooled HTTP connections
+        if hasattr(self, "speech_recognizer"):
+            self.speech_recognizer.close()  # Stop the ASR worker processes
+        if getattr(self, "ocr", None):
+            self.ocr.close()  # Stop the OCR worker processes
+        if hasattr(self, "embedder"):
+            self.embedder.close()  # Stop the embedding threads
+        if getattr(self, "answer_cache", None):
+            print(f"Answer cache hit rate: {100 * self.answer_cache.hit_rate:.0f}%")
+            self.answer_cache.close()
         pygame.quit()  # Uninitialize Pygame
         print(self.config.get_value("messages", "exit_message"))  # Display exit message
@@ -3,6 +3,8 @@ import pygame
 import time
 import numpy as np
 
+from TaskRunner import TASK_EVENT
+
 
 DEFAULT_PATHS = {
     "CONFIG": "assistant.yaml",
@@ -44,6 +46,12 @@ class EduTalkUI:
         self.flashcard_mode = False
         self.current_flashcard = 0
         self.show_answer = False
+        self.waveform_levels = np.zeros(UI_CONFIG["WAVEFORM_BARS"], dtype=np.float32)
+        self._text_cache = {}
+        self._scene = None
+        self._message_expires = None
+        self._message_then = None
+        self.is_busy = False
 
     def _init_pygame(self):
         pygame.init()
@@ -63,16 +71,34 @@ class EduTalkUI:
 
     def update(self, dt=1 / 60):
         self.clock.tick(60)
+        if self._message_expires and time.monotonic() >= self._message_expires:
+            self.display_message(self._message_then)
         self.render()
         return self._process_events()
 
     def _process_events(self):
+        """Return the actions for every pending event, in order.
+
+        Actions are strings for user input; TASK_EVENTs posted by
+        background work are passed through as event objects.
+        """
+        actions = []
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                return "quit"
+                actions.append("quit")
+            elif event.type == TASK_EVENT:
+                actions.append(event)
+            elif event.type == pygame.VIDEORESIZE:
+                self._text_cache.clear()
+                self._scene = None
+            elif event.type == pygame.WINDOWEXPOSED:
+                self._scene = None
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
-                    return "quit"
+                    if self.is_recording and self.assistant.audio_handler.hands_free:
+                        actions.append("cancel_recording")
+                    else:
+                        actions.append("quit")
                 elif event.key == pygame.K_SPACE:
                     if self.flashcard_mode:
                         if not self.show_answer:
@@ -82,25 +108,29 @@ class EduTalkUI:
                             self.show_answer = False
                             if self.current_flashcard >= len(self.assistant.flashcards):
                                 self.flashcard_mode = False
-                                self.display_message("No more flashcards.")
-                                time.sleep(2)
-                                self.display_message(self.config.get_value("messages", "ready"))
+                                self.display_message(
+                                    "No more flashcards.",
+                                    duration=2,
+                                    then=self.config.get_value("messages", "ready"),
+                                )
                     elif self.is_speaking:
-                        return "stop_speaking"
+                        actions.append("stop_speaking")
                     else:
-                        return "start_recording"
+                        actions.append("start_recording")
                 elif event.key == pygame.K_q and self.flashcard_mode:
                     self.flashcard_mode = False
                     self.display_message(self.config.get_value("messages", "ready"))
                 elif event.key == pygame.K_u:
-                    return "upload_file"
+                    actions.append("upload_file")
+                elif event.key == pygame.K_d:
+                    actions.append("upload_directory")
             elif event.type == pygame.KEYUP:
                 if (
                     event.key == pygame.K_SPACE
                     and not self.is_speaking
                     and not self.flashcard_mode
                 ):
-                    return "stop_recording"
+                    actions.append("stop_recording")
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:  # Left click
                     mouse_x, mouse_y = event.pos
@@ -113,25 +143,74 @@ class EduTalkUI:
                         < mouse_y
                         < self.window.get_height() // 2 + 190
                     ):
-                        return "quit"
-        return None
+                        actions.append("quit")
+        return actions
 
     def render(self):
-        self.window.fill(COLORS["BACKGROUND"])
+        """Redraw the window, touching only the waveform when nothing else changed."""
         width, height = self.window.get_size()
         center_x, center_y = width // 2, height // 2
+        scene = (
+            self.flashcard_mode,
+            self.current_flashcard,
+            self.show_answer,
+            self.is_recording,
+            self.is_speaking,
+            self.is_busy,
+            self.current_display_text,
+            width,
+            height,
+        )
+        if scene != self._scene:
+            self._scene = scene
+            self._draw_scene(center_x, center_y)
+            pygame.display.flip()
+            return
+        waveform_y = self._waveform_center(center_y)
+        if waveform_y is None:
+            return  # static screen, nothing to redraw
+        dirty = self._waveform_rect(center_x, waveform_y)
+        self.window.set_clip(dirty)
+        self._draw_scene(center_x, center_y)
+        self.window.set_clip(None)
+        pygame.display.update(dirty)
 
+    def _draw_scene(self, center_x, center_y):
+        self.window.fill(COLORS["BACKGROUND"])
         if self.flashcard_mode:
             self._render_flashcard_ui(center_x, center_y)
         elif self.is_recording:
             self._render_recording_ui(center_x, center_y)
+            self._draw_waveform(self.waveform_levels, center_x, center_y)
         elif self.is_speaking:
             self._render_speaking_ui(center_x, center_y)
+            levels = self.assistant.tts.levels(UI_CONFIG["WAVEFORM_BARS"])
+            self._draw_waveform(levels, center_x, center_y + 40)
         else:
             self._render_idle_ui(center_x, center_y)
 
         self._render_hangup_button(center_x, center_y)
-        pygame.display.flip()
+
+    def _waveform_center(self, center_y):
+        if self.flashcard_mode:
+            return None
+        if self.is_recording:
+            return center_y
+        if self.is_speaking:
+            return center_y + 40
+        return None
+
+    def _bar_width(self):
+        return min(self.window.get_width() // UI_CONFIG["WAVEFORM_BARS"] - 2, 10)
+
+    def _waveform_rect(self, center_x, center_y):
+        total_width = UI_CONFIG["WAVEFORM_BARS"] * self._bar_width()
+        return pygame.Rect(
+            center_x - total_width // 2,
+            center_y - UI_CONFIG["WAVEFORM_HEIGHT"] // 2 - 1,
+            total_width,
+            UI_CONFIG["WAVEFORM_HEIGHT"] + 2,
+        )
 
     def _render_flashcard_ui(self, center_x, center_y):
         if self.current_flashcard < len(self.assistant.flashcards):
@@ -156,13 +235,15 @@ class EduTalkUI:
             )
         else:
             self.flashcard_mode = False
-            self.display_message("No more flashcards.")
-            time.sleep(2)
-            self.display_message(self.config.get_value("messages", "ready"))
+            self.display_message(
+                "No more flashcards.",
+                duration=2,
+                then=self.config.get_value("messages", "ready"),
+            )
 
     def _render_idle_ui(self, center_x, center_y):
         self._draw_text(self.current_display_text, center_x, center_y - 50)
-        instruction = "Press Space to Speak"
+        instruction = "Working... please wait" if self.is_busy else "Press Space to Speak"
         self._draw_text(
             instruction,
             center_x,
@@ -178,8 +259,13 @@ class EduTalkUI:
             (center_x, center_y),
             UI_CONFIG["REC_SIZE"],
         )
+        instruction = (
+            "Listening... Stop talking or press Space when done, Esc to cancel"
+            if self.assistant.audio_handler.hands_free
+            else "Recording... Release Space when done"
+        )
         self._draw_text(
-            "Recording... Release Space when done",
+            instruction,
             center_x,
             center_y + 100,
             font=self.small_font,
@@ -202,70 +288,88 @@ class EduTalkUI:
         text_rect = button_text.get_rect(center=button_rect.center)
         self.window.blit(button_text, text_rect)
 
+    def _layout_text(self, text, font, color, max_width):
+        """Wrap and render text once; cached until the text or window changes."""
+        key = (text, font, color, max_width)
+        lines = self._text_cache.get(key)
+        if lines is not None:
+            return lines
+        words = text.split(" ") if hasattr(text, "split") else ""
+        lines = []
+        current_line = ""
+        for word in words:
+            test_line = f"{current_line} {word}" if current_line else word
+            if not current_line or font.size(test_line)[0] <= max_width:
+                current_line = test_line
+            else:
+                lines.append(current_line)
+                current_line = word
+        if current_line:
+            lines.append(current_line)
+        lines = [font.render(line, True, color) for line in lines]
+        if len(self._text_cache) >= 64:
+            self._text_cache.clear()
+        self._text_cache[key] = lines
+        return lines
+
     def _draw_text(
         self, text: str, center_x, center_y, font=None, color=COLORS["TEXT_PRIMARY"]
     ):
         if font is None:
             font = self.large_font
         max_width = self.window.get_width() - 80
-        words = text.split(" ") if hasattr(text, "split") else ""
-        lines = []
-        current_line = []
-        for word in words:
-            test_line = " ".join(current_line + [word])
-            if font.size(test_line)[0] <= max_width:
-                current_line.append(word)
-            else:
-                lines.append(" ".join(current_line))
-                current_line = [word]
-        if current_line:
-            lines.append(" ".join(current_line))
+        lines = self._layout_text(text, font, color, max_width)
         line_height = font.get_linesize()
         total_height = len(lines) * line_height
         start_y = center_y - (total_height // 2)
-        for i, line in enumerate(lines):
-            line_surface = font.render(line, True, color)
+        for i, line_surface in enumerate(lines):
             line_rect = line_surface.get_rect(
                 center=(center_x, start_y + i * line_height)
             )
             self.window.blit(line_surface, line_rect)
 
-    def display_message(self, text):
+    def display_message(self, text, duration=None, then=None):
+        """Show text; with a duration, switch to `then` once it has elapsed."""
+        self._message_expires = time.monotonic() + duration if duration else None
+        self._message_then = then
         self.current_display_text = text
         if self.status_callback:
             self.status_callback(text)
 
     def display_waveform(self, audio_data):
-        width, height = self.window.get_size()
-        center_x, center_y = width // 2, height // 2
-        if len(audio_data) > 0:
-            samples = len(audio_data)
-            chunk_size = samples // UI_CONFIG["WAVEFORM_BARS"]
-            bar_width = min(width // UI_CONFIG["WAVEFORM_BARS"] - 2, 10)
-            for i in range(UI_CONFIG["WAVEFORM_BARS"]):
-                if i * chunk_size < len(audio_data):
-                    chunk = audio_data[
-                        i * chunk_size : min((i + 1) * chunk_size, samples)
-                    ]
-                    amplitude = (
-                        np.sqrt(np.mean(chunk**2)) * UI_CONFIG["WAVEFORM_HEIGHT"] * 3
-                    )
-                    bar_height = min(int(amplitude), UI_CONFIG["WAVEFORM_HEIGHT"])
-                    color_intensity = min(255, int(bar_height * 2.55))
-                    color = (color_intensity, max(0, 220 - color_intensity), 255)
-                    x = (
-                        center_x
-                        - (UI_CONFIG["WAVEFORM_BARS"] * bar_width) // 2
-                        + i * bar_width
-                    )
-                    pygame.draw.rect(
-                        self.window,
-                        color,
-                        (x, center_y - bar_height // 2, bar_width - 1, bar_height),
-                    )
+        """Store per-bar RMS levels of the latest recorded frame for render."""
+        bars = UI_CONFIG["WAVEFORM_BARS"]
+        chunk_size = len(audio_data) // bars
+        if chunk_size == 0:
+            self.waveform_levels = np.zeros(bars, dtype=np.float32)
+            return
+        blocks = audio_data[: bars * chunk_size].reshape(bars, chunk_size)
+        self.waveform_levels = np.sqrt(
+            np.einsum("ij,ij->i", blocks, blocks) / chunk_size
+        )
+
+    def _draw_waveform(self, levels, center_x, center_y):
+        bar_width = self._bar_width()
+        heights = np.minimum(
+            (np.asarray(levels) * (UI_CONFIG["WAVEFORM_HEIGHT"] * 3)).astype(int),
+            UI_CONFIG["WAVEFORM_HEIGHT"],
+        )
+        intensities = np.minimum(255, (heights * 2.55).astype(int))
+        left = center_x - (UI_CONFIG["WAVEFORM_BARS"] * bar_width) // 2
+        for i, (bar_height, intensity) in enumerate(
+            zip(heights.tolist(), intensities.tolist())
+        ):
+            pygame.draw.rect(
+                self.window,
+                (intensity, max(0, 220 - intensity), 255),
+                (left + i * bar_width, center_y - bar_height // 2, bar_width - 1, bar_height),
+            )
 
     def set_recording(self, is_recording):
         self.is_recording = is_recording
 
     def set_speaking(self, is_speaking):
         self.is_speaking = is_speaking
+
+    def set_busy(self, is_busy):
+        self.is_busy = is_busy
@@ -0,0 +1,272 @@
+import json
+import os
+import threading
+import time
+import numpy as np
+
+
+class LocalVectorStore:
+    """In-process vector index with the same interface as VectorStore.
+
+    Embeddings are L2-normalised and appended as float32 rows to
+    `vectors.f32`, which is memory-mapped for queries; ids, documents and
+    metadata go to an append-only `records.jsonl` log. Deletes only write a
+    tombstone, and the files are compacted once more than half the rows are
+    dead. Cosine top-k is a single matrix multiply plus `argpartition`.
+    """
+
+    def __init__(self, config):
+        self.path = config.get_value("vectorstore", "index_path", ".revira/index")
+        self.compact_ratio = config.get_value("vectorstore", "compact_ratio", 0.5)
+        os.makedirs(self.path, exist_ok=True)
+        self.vectors_path = os.path.join(self.path, "vectors.f32")
+        self.records_path = os.path.join(self.path, "records.jsonl")
+        self._lock = threading.Lock()
+        self.stats = {}
+        self.version = 0  # bumped on every write, so derived indexes can refresh
+        self._load()
+
+    def _load(self):
+        self.dim = None
+        self.rows = []  # row -> (id, document, metadata)
+        self.row_of = {}  # id -> row
+        self.source_codes = {}
+        live, sources = [], []
+        if os.path.exists(self.records_path):
+            with open(self.records_path, "r", encoding="utf-8") as file:
+                for line in file:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if record["op"] == "add":
+                        self.dim = record["dim"]
+                        old = self.row_of.get(record["id"])
+                        if old is not None:
+                            live[old] = False
+                        self.row_of[record["id"]] = len(self.rows)
+                        self.rows.append(
+                            (record["id"], record["document"], record["metadata"])
+                        )
+                        live.append(True)
+                        sources.append(self._source_code(record["metadata"]))
+                    elif record["op"] == "meta":
+                        row = self.row_of.get(record["id"])
+                        if row is not None:
+                            id_, document, _ = self.rows[row]
+                            self.rows[row] = (id_, document, record["metadata"])
+                            sources[row] = self._source_code(record["metadata"])
+                    elif record["op"] == "del":
+                        row = self.row_of.pop(record["id"], None)
+                        if row is not None:
+                            live[row] = False
+        self.live = np.array(live, dtype=bool)
+        self.sources = np.array(sources, dtype=np.int32)
+        self._matrix = None
+        if self.dim and os.path.exists(self.vectors_path):
+            # Drop vectors written without their record (interrupted upsert).
+            expected = len(self.rows) * self.dim * 4
+            if os.path.getsize(self.vectors_path) > expected:
+                os.truncate(self.vectors_path, expected)
+
+    def _source_code(self, metadata):
+        source = (metadata or {}).get("source")
+        return self.source_codes.setdefault(source, len(self.source_codes))
+
+    def _vectors(self):
+        if self._matrix is None and self.rows:
+            self._matrix = np.memmap(
+                self.vectors_path, dtype=np.float32, mode="r", shape=(len(self.rows), self.dim)
+            )
+        return self._matrix
+
+    def _record(self, operation, elapsed):
+        count, total, _ = self.stats.get(operation, (0, 0.0, 0.0))
+        self.stats[operation] = (count + 1, total + elapsed, elapsed)
+
+    @staticmethod
+    def _normalize(embeddings):
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix[None, :]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def _mask(self, where):
+        mask = self.live.copy()
+        if where and "source" in where:
+            wanted = where["source"]
+            if isinstance(wanted, dict):
+                wanted = wanted.get("$in", wanted.get("$eq"))
+            if not isinstance(wanted, list):
+                wanted = [wanted]
+            codes = [self.source_codes[s] for s in wanted if s in self.source_codes]
+            mask &= np.isin(self.sources, codes)
+        return mask
+
+    def connect(self):
+        """Map the vectors file now rather than on the first query."""
+        with self._lock:
+            self._vectors()
+
+    def query(self, query_embeddings, n_results=10, where=None):
+        start = time.perf_counter()
+        try:
+            return self._query(query_embeddings, n_results, where)
+        finally:
+            self._record("query", time.perf_counter() - start)
+
+    def _query(self, query_embeddings, n_results, where):
+        with self._lock:
+            result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+            queries = self._normalize(query_embeddings)
+            matrix = self._vectors()
+            candidates = np.flatnonzero(self._mask(where)) if matrix is not None else []
+            if len(candidates) == 0:
+                for key in result:
+                    result[key] = [[] for _ in queries]
+                return result
+            k = min(n_results, len(candidates))
+            for scores in (queries @ matrix.T)[:, candidates]:
+                top = np.argpartition(-scores, k - 1)[:k]
+                top = top[np.argsort(-scores[top])]
+                rows = [self.rows[candidates[i]] for i in top]
+                result["ids"].append([r[0] for r in rows])
+                result["documents"].append([r[1] for r in rows])
+                result["metadatas"].append([r[2] for r in rows])
+                result["distances"].append([float(1.0 - scores[i]) for i in top])
+        return result
+
+    def upsert(self, ids, documents, embeddings, metadatas=None):
+        if not ids:
+            return
+        start = time.perf_counter()
+        metadatas = metadatas or [{} for _ in ids]
+        vectors = self._normalize(embeddings)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(
+                    f"Embedding width {vectors.shape[1]} doesn't match the index ({self.dim}); "
+                    "clear the store after changing the embedding model"
+                )
+            with open(self.vectors_path, "ab") as file:
+                file.write(vectors.tobytes())
+            replaced = []
+            codes = []
+            with open(self.records_path, "a", encoding="utf-8") as file:
+                for id_, document, metadata in zip(ids, documents, metadatas):
+                    old = self.row_of.get(id_)
+                    if old is not None:
+                        replaced.append(old)
+                    self.row_of[id_] = len(self.rows)
+                    self.rows.append((id_, document, metadata))
+                    codes.append(self._source_code(metadata))
+                    record = {
+                        "op": "add",
+                        "id": id_,
+                        "dim": self.dim,
+                        "document": document,
+                        "metadata": metadata,
+                    }
+                    file.write(json.dumps(record) + "\n")
+            self.live = np.concatenate([self.live, np.ones(len(codes), dtype=bool)])
+            self.live[replaced] = False
+            self.sources = np.concatenate([self.sources, np.array(codes, dtype=np.int32)])
+            self._matrix = None
+            self.version += 1
+            self._maybe_compact()
+        self._record("upsert", time.perf_counter() - start)
+
+    def update(self, ids, metadatas):
+        """Replace the metadata of existing rows, keeping their vectors."""
+        if not ids:
+            return
+        start = time.perf_counter()
+        with self._lock:
+            with open(self.records_path, "a", encoding="utf-8") as file:
+                for id_, metadata in zip(ids, metadatas):
+                    row = self.row_of.get(id_)
+                    if row is None:
+                        continue
+                    self.rows[row] = (id_, self.rows[row][1], metadata)
+                    self.sources[row] = self._source_code(metadata)
+                    file.write(json.dumps({"op": "meta", "id": id_, "metadata": metadata}) + "\n")
+            self.version += 1
+        self._record("update", time.perf_counter() - start)
+
+    def delete(self, ids=None, where=None):
+        if ids is None and where is None:
+            raise ValueError("delete() needs ids or where; use clear() to empty the store")
+        if ids is not None and not ids:
+            return
+        start = time.perf_counter()
+        with self._lock:
+            if ids is None:
+                ids = [self.rows[row][0] for row in np.flatnonzero(self._mask(where))]
+            with open(self.records_path, "a", encoding="utf-8") as file:
+                for id_ in ids:
+                    row = self.row_of.pop(id_, None)
+                    if row is not None:
+                        self.live[row] = False
+                        file.write(json.dumps({"op": "del", "id": id_}) + "\n")
+            self.version += 1
+            self._maybe_compact()
+        self._record("delete", time.perf_counter() - start)
+
+    def get(self, ids=None, where=None, include=("documents", "metadatas")):
+        with self._lock:
+            if ids is None:
+                rows = [self.rows[row] for row in np.flatnonzero(self._mask(where))]
+            else:
+                rows = [self.rows[self.row_of[i]] for i in ids if i in self.row_of]
+        return {
+            "ids": [r[0] for r in rows],
+            "documents": [r[1] for r in rows],
+            "metadatas": [r[2] for r in rows],
+        }
+
+    def clear(self):
+        with self._lock:
+            for path in (self.vectors_path, self.records_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._load()
+            self.version += 1
+
+    def _maybe_compact(self):
+        dead = len(self.rows) - int(self.live.sum())
+        if dead == 0 or dead < self.compact_ratio * len(self.rows):
+            return
+        keep = np.flatnonzero(self.live)
+        vectors = np.array(self._vectors()[keep]) if len(keep) else None
+        self._matrix = None
+        tmp_vectors = f"{self.vectors_path}.tmp"
+        tmp_records = f"{self.records_path}.tmp"
+        with open(tmp_vectors, "wb") as file:
+            if vectors is not None:
+                file.write(vectors.tobytes())
+        with open(tmp_records, "w", encoding="utf-8") as file:
+            for row in keep:
+                id_, document, metadata = self.rows[row]
+                record = {
+                    "op": "add",
+                    "id": id_,
+                    "dim": self.dim,
+                    "document": document,
+                    "metadata": metadata,
+                }
+                file.write(json.dumps(record) + "\n")
+        os.replace(tmp_vectors, self.vectors_path)
+        os.replace(tmp_records, self.records_path)
+        self._load()
+
+    def timing_summary(self):
+        return {
+            operation: {
+                "count": count,
+                "mean_ms": 1000 * total / count,
+                "last_ms": 1000 * last,
+            }
+            for operation, (count, total, last) in self.stats.items()
+        }
@@ -1,15 +1,112 @@
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import random
+import time
+
+from SentenceSegmenter import SentenceSegmenter
+from Tracer import tracer
 
 
 class OllamaConnector:
-    """Handles communication with the Ollama API"""
+    """Handles communication with the Ollama API
+
+    A single pooled `requests.Session` is kept for the lifetime of the
+    connector so consecutive turns reuse the keep-alive connection.
+    Connection failures and 5xx responses are retried with jittered
+    exponential backoff before any tokens have been read.
+    """
+
+    RETRY_STATUSES = (500, 502, 503, 504)
 
     def __init__(self, config):
         self.config = config
         self.context = []
+        self.last_error = None  # set when the last response failed
+        self.url = config.get_value("ollama", "url")
+        self.base_url = self.url.split("/api/", 1)[0]
+        self.timeout = (
+            config.get_value("ollama", "connect_timeout", 3.0),
+            config.get_value("ollama", "read_timeout", 120.0),
+        )
+        self.max_retries = config.get_value("ollama", "max_retries", 3)
+        self.backoff_base = config.get_value("ollama", "backoff_base", 0.25)
+        self.backoff_max = config.get_value("ollama", "backoff_max", 4.0)
+        self.session = self._create_session()
+
+    def _create_session(self):
+        pool_size = self.config.get_value("ollama", "pool_size", 4)
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        headers = self.config.get_value("ollama", "headers", {})
+        if isinstance(headers, str):
+            try:
+                headers = json.loads(headers)
+            except json.JSONDecodeError:
+                print(f"Warning: ignoring invalid [ollama] headers: {headers}")
+                headers = {}
+        session.headers.update(headers)
+        return session
+
+    def _backoff(self, attempt):
+        # Full jitter: spread retries from several clients over the window.
+        delay = min(self.backoff_max, self.backoff_base * 2**attempt)
+        time.sleep(random.uniform(0, delay))
+
+    def _request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.request(method, url, **kwargs)
+                if response.status_code not in self.RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response
+                if attempt == self.max_retries:
+                    response.raise_for_status()
+                response.content  # drain so the connection goes back to the pool
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == self.max_retries:
+                    raise
+            self._backoff(attempt)
+
+    def check_health(self):
+        """Return True if the server answers and has the configured model."""
+        try:
+            response = self._request("GET", f"{self.base_url}/api/tags")
+            models = [m.get("name") for m in response.json().get("models", [])]
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Ollama health check failed: {e}")
+            return False
+        model = self.config.get_value("ollama", "model")
+        if models and model not in models and f"{model}:latest" not in models:
+            print(f"Warning: model '{model}' is not pulled on the Ollama server.")
+        return True
+
+    def _options(self):
+        # The same options must be sent with every request, or Ollama
+        # reloads the model to apply them.
+        return {
+            "num_ctx": self.config.get_value("conversation", "max_context_length", 4096)
+        }
+
+    def preload(self):
+        """Load the model into memory ahead of the first question.
 
-    def generate_response(self, prompt, callback=None):
+        A generate request without a prompt only loads the model; it then
+        stays resident for `keep_alive`.
+        """
+        payload = {
+            "model": self.config.get_value("ollama", "model"),
+            "stream": False,
+            "options": self._options(),
+            "keep_alive": self.config.get_value("ollama", "keep_alive", "30m"),
+        }
+        self._request("POST", self.url, json=payload).close()
+
+    def generate_response(self, prompt, callback=None, should_stop=None):
+        self.last_error = None
         try:
             if not prompt.strip():
                 return "I couldn't hear anything. Please try again."
@@ -18,49 +115,56 @@ class OllamaConnector:
                 "stream": True,
                 "context": self.context,
                 "prompt": prompt,
+                "options": self._options(),
+                "keep_alive": self.config.get_value("ollama", "keep_alive", "30m"),
                 # "system": self.config.conversation.system_prompt,
             }
-            response = requests.post(
-                self.config.get_value("ollama", "url"),
-                json=payload,
-                headers=self.config.get_value("ollama", "headers"),
-                stream=True,
-            )
-            response.raise_for_status()
-            full_response = ""
-            sentence_buffer = ""
-
-            in_think = False
+            with tracer.span("generate"):
+                return self._stream(payload, callback, should_stop)
+        except requests.exceptions.RequestException as e:
+            print(f"Error connecting to Ollama API: {e}")
+            self.last_error = e
+            return "I'm having trouble connecting to my language model."
+
+    def _stream(self, payload, callback, should_stop):
+        response = self._request("POST", self.url, json=payload, stream=True)
+        segmenter = SentenceSegmenter(
+            self.config.get_value("tts", "segment_max_chars", 120)
+        )
+        with response:
             for line in response.iter_lines():
+                if should_stop and should_stop():
+                    break  # closing the response aborts generation
                 if not line:
                     continue
                 try:
                     body = json.loads(line)
-                    token = body.get("response", "")
-
-                    # Check if we are inside a <think> block
-                    if "<think>" in token:
-                        in_think = True  # Start ignoring tokens
-                        continue
-                    if "</think>" in token:
-                        in_think = False  # Stop ignoring tokens
-                        continue
-
-                    if not in_think:  # Only append if not in <think> mode
-                        sentence_buffer += token
-                        full_response += token
-
-                    if token in [".", "!", "?", ":"]: # TODO: ignore emojies
-                        if callback and sentence_buffer:
-                            callback(sentence_buffer)
-                            sentence_buffer = ""
-                    if "context" in body:
-                        self.context = body["context"]
-                    if body.get("done", False) and sentence_buffer:
-                        if callback:
-                            callback(sentence_buffer)
                 except json.JSONDecodeError:
                     continue
-        except requests.exceptions.RequestException as e:
-            print(f"Error connecting to Ollama API: {e}")
-            return "I'm having trouble connecting to my language model."
+                if body.get("response"):
+                    tracer.mark("first_token")
+                segments = segmenter.feed(body.get("response", ""))
+                if body.get("done", False):
+                    segments += segmenter.flush()
+                    self._trace_stats(body)
+                if "context" in body:
+                    self.context = body["context"]
+                if callback:
+                    for segment in segments:
+                        callback(segment)
+        return segmenter.text.strip()
+
+    @staticmethod
+    def _trace_stats(body):
+        """Record Ollama's own counters from the final streamed message."""
+        for key in ("prompt_eval_count", "eval_count"):
+            if key in body:
+                tracer.set(key, body[key])
+        for key in ("load_duration", "prompt_eval_duration", "eval_duration"):
+            if key in body:
+                tracer.set(f"{key}_ms", body[key] / 1e6)  # reported in ns
+        if body.get("eval_count") and body.get("eval_duration"):
+            tracer.set("tokens_per_second", body["eval_count"] / body["eval_duration"] * 1e9)
+
+    def close(self):
+        self.session.close()
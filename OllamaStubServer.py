@@ -0,0 +1,333 @@
+"""Minimal offline stand-in for the Ollama HTTP API.
+
+Serves /api/tags, /api/version, streaming /api/generate and /api/embed on
+HTTP/1.1 keep-alive connections so the connector can be exercised without
+a model. Run it directly and point `[ollama] url` at it:
+
+    python OllamaStubServer.py --port 11435 --token-delay 0.02
+
+Streams recorded from a real server with `record_generate` and
+`record_embed` can be replayed instead of the canned response, with the
+token timing set by the stub rather than the recording:
+
+    python OllamaStubServer.py --replay-generate answers.ndjson --replay-embed embeds.ndjson
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import hashlib
+import json
+import threading
+import time
+
+DEFAULT_RESPONSE = (
+    "<think>The student wants their schedule.</think>"
+    "Your next lecture is Data Structures at 09:00 on Monday. "
+    "After that you have Algorithms at 11:00!"
+)
+EMBED_DIM = 768
+
+
+def fake_embedding(text, dim=EMBED_DIM):
+    """Deterministic unit vector derived from the text hash."""
+    seed = hashlib.sha256(text.encode("utf-8")).digest()
+    values = [(seed[i % len(seed)] - 127.5) / 127.5 for i in range(dim)]
+    norm = sum(v * v for v in values) ** 0.5 or 1.0
+    return [v / norm for v in values]
+
+
+def load_streams(path):
+    """Read recorded /api/generate NDJSON; each stream ends at a done line."""
+    streams, current = [], []
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            current.append(json.loads(line))
+            if current[-1].get("done"):
+                streams.append(current)
+                current = []
+    if current:
+        streams.append(current)
+    return streams
+
+
+def load_embeddings(path):
+    """Read recorded {"input": text, "embedding": [...]} lines into a dict."""
+    embeddings = {}
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                record = json.loads(line)
+                embeddings[record["input"]] = record["embedding"]
+    return embeddings
+
+
+def record_generate(url, model, prompts, path):
+    """Append the raw /api/generate stream for each prompt to `path`."""
+    import requests
+
+    with open(path, "a", encoding="utf-8") as file:
+        for prompt in prompts:
+            payload = {"model": model, "prompt": prompt, "stream": True}
+            with requests.post(f"{url}/api/generate", json=payload, stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if line:
+                        file.write(line.decode("utf-8") + "\n")
+
+
+def record_embed(url, model, texts, path):
+    """Append the real embedding of each text to `path`."""
+    import requests
+
+    response = requests.post(f"{url}/api/embed", json={"model": model, "input": texts})
+    response.raise_for_status()
+    with open(path, "a", encoding="utf-8") as file:
+        for text, embedding in zip(texts, response.json()["embeddings"]):
+            file.write(json.dumps({"input": text, "embedding": embedding}) + "\n")
+
+
+def split_tokens(text):
+    """Split text into word-ish pieces the way a BPE tokenizer roughly would."""
+    tokens, current = [], ""
+    for char in text:
+        if char in " <>" and current:
+            tokens.append(current)
+            current = ""
+        current += char
+    if current:
+        tokens.append(current)
+    return tokens
+
+
+class OllamaStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def _send_json(self, body, status=200):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests += 1
+        if self.path in ("/", ""):
+            body = b"Ollama is running"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == "/api/version":
+            self._send_json({"version": "stub"})
+        elif self.path == "/api/tags":
+            self._send_json({"models": [{"name": m} for m in self.server.models]})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        with self.server.lock:
+            self.server.requests += 1
+            fail = self.server.fail_next > 0
+            if fail:
+                self.server.fail_next -= 1
+        payload = self._read_json()
+        if fail:
+            self._send_json({"error": "stub failure"}, status=503)
+        elif self.path == "/api/generate":
+            self._generate(payload)
+        elif self.path == "/api/embed":
+            inputs = payload.get("input", [])
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            unknown = [text for text in inputs if text not in self.server.embeddings]
+            if unknown and self.server.strict_embeddings:
+                self._send_json(
+                    {"error": f"no recorded embedding for {unknown[0][:60]!r}"}, status=404
+                )
+                return
+            self._send_json(
+                {
+                    "model": payload.get("model"),
+                    "embeddings": [
+                        self.server.embeddings.get(text) or fake_embedding(text)
+                        for text in inputs
+                    ],
+                }
+            )
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def _generate(self, payload):
+        model = payload.get("model", "stub")
+        stream = payload.get("stream", True)
+        if not payload.get("prompt"):
+            # Like Ollama, an empty prompt only loads the model.
+            self._send_json({"model": model, "response": "", "done": True, "done_reason": "load"})
+            return
+        if self.server.generate_streams:
+            self._replay(self.server.next_stream(), stream)
+            return
+        tokens = split_tokens(self.server.response_text)
+        if not stream:
+            self._send_json(
+                {"model": model, "response": "".join(tokens), "done": True, "context": [1, 2, 3]}
+            )
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        started = time.perf_counter_ns()
+        time.sleep(self.server.first_token_delay)
+        prompt_done = time.perf_counter_ns()
+        for token in tokens:
+            line = {"model": model, "response": token, "done": False}
+            self._write_chunk(json.dumps(line).encode("utf-8") + b"\n")
+            time.sleep(self.server.token_delay)
+        final = {
+            "model": model,
+            "response": "",
+            "done": True,
+            "context": [1, 2, 3],
+            "prompt_eval_count": len(payload.get("prompt", "").split()),
+            "prompt_eval_duration": prompt_done - started,
+            "eval_count": len(tokens),
+            "eval_duration": time.perf_counter_ns() - prompt_done,
+        }
+        self._write_chunk(json.dumps(final).encode("utf-8") + b"\n")
+        self._write_chunk(b"")
+
+
+    def _replay(self, chunks, stream):
+        """Send a recorded stream with the stub's own token timing."""
+        if not stream:
+            final = dict(chunks[-1])
+            final["response"] = "".join(chunk.get("response", "") for chunk in chunks)
+            self._send_json(final)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        started = time.perf_counter_ns()
+        time.sleep(self.server.first_token_delay)
+        prompt_done = time.perf_counter_ns()
+        for i, chunk in enumerate(chunks):
+            if chunk.get("done"):
+                # Report the replayed timing, not the recorded one.
+                chunk = dict(chunk)
+                chunk["prompt_eval_duration"] = prompt_done - started
+                chunk["eval_duration"] = time.perf_counter_ns() - prompt_done
+            elif i:
+                time.sleep(self.server.token_delay)
+            self._write_chunk(json.dumps(chunk).encode("utf-8") + b"\n")
+        self._write_chunk(b"")
+
+
+class OllamaStubServer(ThreadingHTTPServer):
+    """Threaded stub server; counts connections and requests it has seen."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        response_text=DEFAULT_RESPONSE,
+        token_delay=0.0,
+        first_token_delay=0.0,
+        models=("deepseek-r1:1.5b", "nomic-embed-text:latest"),
+        verbose=False,
+        generate_streams=None,
+        embeddings=None,
+        strict_embeddings=False,
+    ):
+        super().__init__((host, port), OllamaStubHandler)
+        self.response_text = response_text
+        self.token_delay = token_delay
+        self.first_token_delay = first_token_delay
+        self.models = list(models)
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self.fail_next = 0
+        self.generate_streams = generate_streams or []
+        self.embeddings = embeddings or {}
+        self.strict_embeddings = strict_embeddings  # 404 instead of fake vectors
+        self._next_stream = 0
+        self._thread = None
+
+    def next_stream(self):
+        """Recorded streams are replayed in order, wrapping around."""
+        with self.lock:
+            chunks = self.generate_streams[self._next_stream % len(self.generate_streams)]
+            self._next_stream += 1
+        return chunks
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--first-token-delay", type=float, default=0.1)
+    parser.add_argument("--replay-generate", help="recorded /api/generate NDJSON")
+    parser.add_argument("--replay-embed", help="recorded embeddings NDJSON")
+    args = parser.parse_args()
+    server = OllamaStubServer(
+        args.host,
+        args.port,
+        token_delay=args.token_delay,
+        first_token_delay=args.first_token_delay,
+        verbose=True,
+        generate_streams=load_streams(args.replay_generate) if args.replay_generate else None,
+        embeddings=load_embeddings(args.replay_embed) if args.replay_embed else None,
+    )
+    print(f"Ollama stub listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
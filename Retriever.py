@@ -0,0 +1,201 @@
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+import numpy as np
+
+from rag.chunker import count_tokens
+from Tracer import tracer
+
+# Keeps times (09:00), course codes (cs101) and decimals (3.5) whole.
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[:.][0-9]+)*")
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """In-memory Okapi BM25 over the chunks in the vector store."""
+
+    def __init__(self, ids, documents, k1=1.2, b=0.75):
+        self.ids = list(ids)
+        self.k1 = k1
+        self.b = b
+        self.postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        lengths = []
+        for row, document in enumerate(documents):
+            terms = tokenize(document)
+            lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self.postings[term].append((row, tf))
+        self.lengths = np.array(lengths, dtype=np.float32)
+        self.avg_length = float(self.lengths.mean()) if lengths else 0.0
+
+    def search(self, query: str, n_results: int) -> list[str]:
+        if not self.ids:
+            return []
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.lengths / max(self.avg_length, 1e-6))
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (len(self.ids) - len(postings) + 0.5) / (len(postings) + 0.5))
+            rows = np.fromiter((r for r, _ in postings), dtype=np.int64, count=len(postings))
+            tf = np.fromiter((t for _, t in postings), dtype=np.float32, count=len(postings))
+            scores[rows] += idf * tf * (self.k1 + 1) / (tf + norm[rows])
+        matched = np.flatnonzero(scores)
+        if len(matched) == 0:
+            return []
+        k = min(n_results, len(matched))
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [self.ids[i] for i in top]
+
+
+class Retriever:
+    """Hybrid retrieval: BM25 and vector search fused with reciprocal rank.
+
+    Each search takes the top `candidates` from both rankings, combines them
+    with reciprocal rank fusion, drops chunks that mostly repeat one already
+    chosen (the chunker's overlap), and packs the rest in rank order into a
+    token budget. The BM25 index is rebuilt lazily whenever the store has
+    changed. Per-stage timings of the last search are kept in `timings`.
+    """
+
+    def __init__(self, vector_store, embedder, config):
+        self.config = config
+        self.vector_store = vector_store
+        self.embedder = embedder
+        self.n_results = config.get_value("retrieval", "n_results", 4)
+        self.candidates = config.get_value("retrieval", "candidates", 20)
+        self.rrf_k = config.get_value("retrieval", "rrf_k", 60)
+        self._index = None
+        self._documents = {}  # id -> (document, metadata)
+        self._index_version = None
+        self._lock = threading.Lock()
+        self.timings: dict[str, float] = {}
+
+    def _bm25(self) -> BM25Index:
+        with self._lock:
+            version = getattr(self.vector_store, "version", None)
+            if self._index is None or version is None or version != self._index_version:
+                records = self.vector_store.get()
+                self._documents = {
+                    id_: (document, metadata or {})
+                    for id_, document, metadata in zip(
+                        records["ids"], records["documents"], records["metadatas"]
+                    )
+                }
+                self._index = BM25Index(records["ids"], records["documents"])
+                self._index_version = version
+            return self._index
+
+    def documents(self) -> list[str]:
+        """Text of every chunk in the store."""
+        self._bm25()
+        return [document for document, _ in self._documents.values()]
+
+    def warm_up(self):
+        """Connect to the store and build the BM25 index ahead of the first question."""
+        self.vector_store.connect()
+        self._bm25()
+
+    def retrieve(self, query: str, budget: int, embedding=None) -> list[tuple[str, dict]]:
+        """Return (document, metadata) pairs fitting in `budget` tokens."""
+        timings = {}
+        start = time.perf_counter()
+        if embedding is None:
+            embedding = self.embedder.embed_query(query)
+        timings["embed"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = self.vector_store.query([embedding], n_results=self.candidates)
+        vector_ids = result["ids"][0]
+        timings["vector"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = self._bm25()
+        lexical_ids = index.search(query, self.candidates)
+        timings["bm25"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        documents = {
+            id_: (document, metadata or {})
+            for id_, document, metadata in zip(
+                vector_ids, result["documents"][0], result["metadatas"][0]
+            )
+        }
+        for id_ in lexical_ids:
+            documents.setdefault(id_, self._documents[id_])
+        scores: dict[str, float] = defaultdict(float)
+        for ranking in (vector_ids, lexical_ids):
+            for rank, id_ in enumerate(ranking):
+                scores[id_] += 1.0 / (self.rrf_k + rank + 1)
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        timings["fuse"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        packed = self._pack([documents[id_] for id_ in ranked if id_ in documents], budget)
+        timings["pack"] = time.perf_counter() - start
+        self.timings = timings
+        for stage, seconds in timings.items():
+            tracer.add(f"retrieve.{stage}", seconds)
+        tracer.set("context_chunks", len(packed))
+        return packed
+
+    def build_prompt(self, question: str, embedding=None):
+        """Fill the system prompt with the question and retrieved context.
+
+        The context gets whatever `max_context_length` leaves after the
+        prompt template and the tokens reserved for the answer. Returns the
+        prompt and the (document, metadata) pairs it contains.
+        """
+        sys_prompt = self.config.get_value("conversation", "system_prompt")
+        prompt = sys_prompt.replace("<query>", question)
+        budget = (
+            self.config.get_value("conversation", "max_context_length", 4096)
+            - count_tokens(prompt)
+            - self.config.get_value("retrieval", "answer_tokens", 512)
+        )
+        hits = self.retrieve(question, max(budget, 0), embedding)
+        context = "[Timetable data:\n" + "\n\n".join(d for d, _ in hits) + "]"
+        return re.sub(r"\[(.*?)\]", lambda _: context, prompt, count=1), hits
+
+    def _pack(self, hits, budget):
+        chosen = []
+        used = 0
+        for document, metadata in hits:
+            if len(chosen) >= self.n_results:
+                break
+            if any(
+                document == other_document or self._redundant(metadata, other)
+                for other_document, other in chosen
+            ):
+                continue
+            tokens = count_tokens(document) + 2  # blank line between chunks
+            if used + tokens > budget:
+                continue
+            chosen.append((document, metadata))
+            used += tokens
+        return chosen
+
+    @staticmethod
+    def _redundant(metadata, other) -> bool:
+        """True if two chunks of the same page share over half the shorter one."""
+        if "start" not in metadata or "start" not in other:
+            return False
+        if metadata.get("source") != other.get("source"):
+            return False
+        if metadata.get("page") != other.get("page"):
+            return False
+        shared = min(metadata["end"], other["end"]) - max(metadata["start"], other["start"])
+        shorter = min(
+            metadata["end"] - metadata["start"], other["end"] - other["start"]
+        )
+        return shorter > 0 and shared > shorter / 2
+
+    def timing_summary(self) -> str:
+        return ", ".join(f"{stage} {1000 * t:.1f} ms" for stage, t in self.timings.items())
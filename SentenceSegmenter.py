@@ -0,0 +1,162 @@
+import re
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+TERMINATORS = ".!?;:…"
+CLOSERS = "\"')]}»”’"
+ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "st", "sr", "jr", "vs", "etc", "e.g",
+    "i.e", "approx", "no", "fig", "dept", "min", "max", "mt", "ave", "rd",
+}
+EMOJI = re.compile(
+    "[\U0001f000-\U0001faff\U00002600-\U000027bf\U0000fe0f\U0000200d\U0001f1e6-\U0001f1ff]"
+)
+CLAUSE_BREAK = re.compile(r"[,;)\]]\s|\s[-–—]\s")
+
+
+def _partial_tag(text, tag):
+    """Length of the longest suffix of text that is a proper prefix of tag."""
+    for size in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:size]):
+            return size
+    return 0
+
+
+class SentenceSegmenter:
+    """Incrementally splits streamed LLM tokens into speakable segments.
+
+    Tokens can be cut anywhere, so `<think>` blocks and sentence ends are
+    recognised across token boundaries. Abbreviations, initials, decimals,
+    times and numbered list items do not end a sentence; newlines and
+    emojis do. If no boundary turns up within `max_chars` the text is cut
+    at the last clause break so speech can start without waiting for the
+    end of a long sentence.
+    """
+
+    def __init__(self, max_chars=120):
+        self.max_chars = max_chars
+        self.text = ""
+        self._raw = ""
+        self._in_think = False
+        self._buffer = ""
+        self._scan = 0
+
+    def feed(self, token):
+        """Add a token and return the list of segments it completed."""
+        self._raw += token
+        visible = self._filter_think()
+        if not visible:
+            return []
+        self.text += visible
+        self._buffer += visible
+        return self._segments()
+
+    def flush(self):
+        """Return whatever is left once the stream has ended."""
+        if not self._in_think:
+            self.text += self._raw
+            self._buffer += self._raw
+        self._raw = ""
+        segments = self._segments()
+        tail = self._clean(self._buffer)
+        self._buffer = ""
+        self._scan = 0
+        if tail:
+            segments.append(tail)
+        return segments
+
+    def _filter_think(self):
+        visible = ""
+        while self._raw:
+            if self._in_think:
+                end = self._raw.find(THINK_CLOSE)
+                if end < 0:
+                    keep = _partial_tag(self._raw, THINK_CLOSE)
+                    self._raw = self._raw[len(self._raw) - keep :]
+                    break
+                self._raw = self._raw[end + len(THINK_CLOSE) :]
+                self._in_think = False
+            else:
+                start = self._raw.find(THINK_OPEN)
+                if start < 0:
+                    keep = _partial_tag(self._raw, THINK_OPEN)
+                    visible += self._raw[: len(self._raw) - keep]
+                    self._raw = self._raw[len(self._raw) - keep :]
+                    break
+                visible += self._raw[:start]
+                self._raw = self._raw[start + len(THINK_OPEN) :]
+                self._in_think = True
+        return visible
+
+    @staticmethod
+    def _clean(text):
+        return " ".join(EMOJI.sub(" ", text).split())
+
+    def _is_boundary(self, i):
+        """Whether the sentence ends after buffer[i]; None if undecidable yet."""
+        buffer = self._buffer
+        char = buffer[i]
+        if char == "\n":
+            return True
+        if EMOJI.match(char):
+            if i + 1 >= len(buffer):
+                return None  # more emoji may follow in the next token
+            return not EMOJI.match(buffer[i + 1])
+        if char not in TERMINATORS:
+            return False
+        j = i + 1
+        while j < len(buffer) and buffer[j] in CLOSERS:
+            j += 1
+        if j >= len(buffer):
+            return None
+        if not buffer[j].isspace():
+            return False  # 3.5, 10:30, e.g. mid-word
+        if char == ".":
+            word = re.search(r"(\S+)$", buffer[:i])
+            word = word.group(1).lower().lstrip("(\"'") if word else ""
+            if word in ABBREVIATIONS or (len(word) == 1 and word.isalpha()):
+                return False
+            line_start = buffer.rfind("\n", 0, i) + 1
+            if word.isdigit() and not buffer[line_start:i - len(word)].strip():
+                return False  # "1. " list item
+        return True
+
+    def _segments(self):
+        segments = []
+        start = 0
+        i = self._scan
+        while i < len(self._buffer):
+            boundary = self._is_boundary(i)
+            if boundary is None:
+                break
+            if boundary:
+                j = i + 1
+                while j < len(self._buffer) and self._buffer[j] in CLOSERS:
+                    j += 1
+                segment = self._clean(self._buffer[start:j])
+                if segment:
+                    segments.append(segment)
+                start = j
+                i = j
+                continue
+            i += 1
+        self._buffer = self._buffer[start:]
+        self._scan = i - start
+        if len(self._buffer) >= self.max_chars:
+            segments.extend(self._force_split())
+        return segments
+
+    def _force_split(self):
+        window = self._buffer[: self.max_chars]
+        cut = 0
+        for match in CLAUSE_BREAK.finditer(window):
+            cut = match.start() + 1
+        if cut == 0:
+            cut = window.rfind(" ") + 1
+        if cut <= 0:
+            return []
+        segment = self._clean(self._buffer[:cut])
+        self._buffer = self._buffer[cut:]
+        self._scan = 0
+        return [segment] if segment else []
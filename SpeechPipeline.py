@@ -0,0 +1,122 @@
+import queue
+import threading
+
+
+class SpeechPipeline:
+    """Overlaps LLM generation, speech synthesis and playback.
+
+    The generation thread feeds text segments through `submit`. A pool of
+    synthesis workers turns them into audio while a single playback thread
+    plays the results strictly in submission order. All stages are bounded,
+    so a fast generator cannot run arbitrarily far ahead of playback, and
+    `cancel` discards everything that is queued.
+    """
+
+    def __init__(self, tts, workers=2, queue_size=4, on_segment=None):
+        self.tts = tts
+        self.on_segment = on_segment
+        self._texts = queue.Queue(maxsize=queue_size)
+        self._slots = threading.Semaphore(queue_size)
+        self._ready = {}
+        self._cond = threading.Condition()
+        self._cancelled = threading.Event()
+        self._submitted = 0
+        self._total = None
+        self._threads = [
+            threading.Thread(target=self._synthesis_worker) for _ in range(workers)
+        ]
+        self._threads.append(threading.Thread(target=self._playback_worker))
+        for thread in self._threads:
+            thread.daemon = True
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def _put(self, item):
+        while not self._cancelled.is_set():
+            try:
+                self._texts.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def submit(self, text):
+        """Queue a text segment; blocks while the pipeline is full."""
+        if self._put((self._submitted, text)):
+            self._submitted += 1
+
+    def finish(self):
+        """Signal that no more segments will be submitted."""
+        with self._cond:
+            self._total = self._submitted
+            self._cond.notify_all()
+        for _ in range(len(self._threads) - 1):
+            self._put(None)
+
+    def wait(self):
+        """Block until everything submitted has played or was cancelled."""
+        self._threads[-1].join()
+
+    def cancel(self):
+        self._cancelled.set()
+        while True:
+            try:
+                self._texts.get_nowait()
+            except queue.Empty:
+                break
+        with self._cond:
+            self._ready.clear()
+            self._cond.notify_all()
+        self.tts.stop()
+
+    def _synthesis_worker(self):
+        while not self._cancelled.is_set():
+            # Take a playback slot before the next segment so finished audio
+            # never piles up far ahead of the player, and so the lowest
+            # pending segment is always the one being synthesized.
+            if not self._slots.acquire(timeout=0.1):
+                continue
+            item = None
+            while not self._cancelled.is_set():
+                try:
+                    item = self._texts.get(timeout=0.1)
+                    break
+                except queue.Empty:
+                    continue
+            if item is None:
+                self._slots.release()
+                return
+            seq, text = item
+            audio = self.tts.synthesize(text)
+            with self._cond:
+                if self._cancelled.is_set():
+                    return
+                self._ready[seq] = (text, audio)
+                self._cond.notify_all()
+
+    def _playback_worker(self):
+        seq = 0
+        while True:
+            with self._cond:
+                while (
+                    seq not in self._ready
+                    and not self._cancelled.is_set()
+                    and (self._total is None or seq < self._total)
+                ):
+                    self._cond.wait()
+                if self._cancelled.is_set() or seq not in self._ready:
+                    return
+                text, audio = self._ready.pop(seq)
+            if self.on_segment:
+                self.on_segment(text)
+            if self._cancelled.is_set():
+                return
+            self.tts.play(audio)
+            self._slots.release()
+            seq += 1
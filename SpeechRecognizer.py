@@ -1,32 +1,313 @@
-import whisper
+import bisect
+import threading
+import numpy as np
+
+from Tracer import tracer
+from rag.vocabulary import extract_vocabulary, vocabulary_prompt
+
+SAMPLE_RATE = 16000
+BATCH_SECONDS = 30  # Whisper's input window; longer clips are decoded on their own
+
+
+class WhisperEngine:
+    """openai-whisper on PyTorch."""
+
+    name = "whisper"
+
+    def __init__(self, model_path, device="cpu", threads=0, compute_type=None):
+        import torch  # pulled in by whisper anyway; imported when the model is loaded
+        import whisper
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.model = whisper.load_model(model_path, device=device)
+        # Each decode installs kv-cache hooks on the shared model, so two
+        # decodes (streaming window and final tail) must not overlap.
+        self._lock = threading.Lock()
+
+    def transcribe(
+        self, audio_data, beam_size=1, word_timestamps=False, cancelled=None, **options
+    ):
+        # whisper decodes greedily unless a beam size is given
+        with self._lock:
+            if cancelled is not None and cancelled():
+                return None, None  # went stale while waiting for the lock
+            transcript = self.model.transcribe(
+                audio_data,
+                beam_size=beam_size if beam_size > 1 else None,
+                word_timestamps=word_timestamps,
+                **options,
+            )
+        words = None
+        if word_timestamps:
+            words = [
+                (word["word"].strip(), word["start"], word["end"])
+                for segment in transcript.get("segments", [])
+                for word in segment.get("words", [])
+            ]
+        return transcript["text"].strip(), words
+
+    def transcribe_batch(
+        self,
+        clips,
+        beam_size=1,
+        temperature=0.0,
+        initial_prompt=None,
+        fp16=None,
+        language=None,
+        **options,
+    ):
+        """Decode clips of up to 30 s together as one padded log-mel batch.
+
+        A single greedy (or beam) pass at the first temperature; there is
+        no fallback to hotter temperatures per clip as in `transcribe`.
+        """
+        import torch
+        import whisper
+
+        mels = torch.stack(
+            [
+                whisper.log_mel_spectrogram(
+                    whisper.pad_or_trim(torch.from_numpy(clip)), n_mels=self.model.dims.n_mels
+                )
+                for clip in clips
+            ]
+        ).to(self.model.device)
+        decoding = whisper.DecodingOptions(
+            language=language,
+            temperature=temperature[0] if isinstance(temperature, tuple) else temperature,
+            beam_size=beam_size if beam_size > 1 else None,
+            prompt=initial_prompt,
+            fp16=bool(fp16),
+            without_timestamps=True,
+        )
+        with self._lock:
+            results = whisper.decode(self.model, mels, decoding)
+        return [result.text.strip() for result in results]
+
+
+class FasterWhisperEngine:
+    """Whisper on CTranslate2 (faster-whisper), int8-quantized on CPU by default."""
+
+    name = "faster-whisper"
+
+    def __init__(self, model_path, device="cpu", threads=0, compute_type="int8"):
+        from faster_whisper import WhisperModel  # only needed for this engine
+
+        self.model = WhisperModel(
+            model_path,
+            device=device,
+            compute_type=compute_type or "int8",
+            cpu_threads=threads,
+        )
+
+    def transcribe(
+        self,
+        audio_data,
+        beam_size=1,
+        word_timestamps=False,
+        cancelled=None,
+        fp16=None,
+        **options,
+    ):
+        # The precision is fixed by compute_type when the model is loaded.
+        segments, _ = self.model.transcribe(
+            audio_data,
+            beam_size=max(1, beam_size),
+            word_timestamps=word_timestamps,
+            **options,
+        )
+        decoded = []
+        for segment in segments:  # decoding happens while iterating
+            if cancelled is not None and cancelled():
+                return None, None
+            decoded.append(segment)
+        segments = decoded
+        words = None
+        if word_timestamps:
+            words = [
+                (word.word.strip(), word.start, word.end)
+                for segment in segments
+                for word in segment.words or []
+            ]
+        return "".join(segment.text for segment in segments).strip(), words
+
+    def transcribe_batch(self, clips, beam_size=1, fp16=None, **options):
+        """Decode clips of up to 30 s together with faster-whisper's batched pipeline.
+
+        The clips are laid end to end and marked with `clip_timestamps`, so
+        the pipeline decodes each one as its own batch row, and segments are
+        mapped back to their clip by midpoint.
+        """
+        from faster_whisper import BatchedInferencePipeline
+
+        starts, offset = [], 0
+        for clip in clips:
+            starts.append(offset)
+            offset += len(clip)
+        segments, _ = BatchedInferencePipeline(self.model).transcribe(
+            np.concatenate(clips),
+            beam_size=max(1, beam_size),
+            vad_filter=False,
+            clip_timestamps=[
+                {"start": start, "end": start + len(clip)} for start, clip in zip(starts, clips)
+            ],
+            batch_size=len(clips),
+            **options,
+        )
+        texts = [""] * len(clips)
+        for segment in segments:
+            middle = (segment.start + segment.end) / 2 * SAMPLE_RATE
+            index = bisect.bisect_right(starts, middle) - 1
+            texts[index] += segment.text
+        return [text.strip() for text in texts]
+
+
+ENGINES = {"whisper": WhisperEngine, "faster-whisper": FasterWhisperEngine}
+
+
+def load_audio(clip):
+    """Float32 samples at 16 kHz from an array or an audio file path."""
+    if not isinstance(clip, str):
+        return np.asarray(clip, dtype=np.float32).ravel()
+    try:
+        from faster_whisper import decode_audio  # PyAV, no ffmpeg binary needed
+    except ImportError:
+        from whisper import load_audio as decode_audio
+    return decode_audio(clip)
 
 
 # Supporting Classes
 class SpeechRecognizer:
-    """Handles speech recognition using Whisper"""
+    """Handles speech recognition using the Whisper engine chosen in config.toml"""
 
     def __init__(self, config):
         self.config = config
         self.model = None
+        self.vocabulary = None
 
     def load_model(self):
+        name = self.config.get_value("whisper", "engine", "whisper")
+        engine = ENGINES.get(name)
+        if engine is None:
+            print(f"Warning: unknown Whisper engine '{name}', using whisper.")
+            engine = WhisperEngine
+        options = {
+            "device": self.config.get_value("whisper", "device", "cpu"),
+            "threads": self.config.get_value("whisper", "threads", 0),
+            "compute_type": self.config.get_value("whisper", "compute_type", "int8"),
+        }
+        model_path = self.config.get_value("whisper", "model_path")
         try:
-            self.model = whisper.load_model(self.config.get_value("whisper", "model_path"))
+            try:
+                self.model = engine(model_path, **options)
+            except ImportError as e:
+                if engine is WhisperEngine:
+                    raise
+                print(f"Warning: {name} is not installed ({e}), using whisper.")
+                self.model = WhisperEngine(model_path, **options)
             return True
         except Exception as e:
             print(f"Error loading Whisper model: {e}")
             return False
 
-    def transcribe(self, audio_data):
+    def warm_up(self):
+        """Run a short silent clip through the model so the first real
+        transcription doesn't pay for lazy initialisation."""
+        self.transcribe(np.zeros(8000, dtype=np.float32))
+
+    def set_vocabulary(self, documents):
+        """Seed every decode with course names found in `documents`."""
+        size = self.config.get_value("whisper", "vocabulary_size", 30)
+        phrases = extract_vocabulary(documents, size) if size else []
+        self.vocabulary = vocabulary_prompt(phrases)
+        return phrases
+
+    def prompt(self, initial_prompt=None):
+        """The document vocabulary followed by `initial_prompt`, or None."""
+        return " ".join(p for p in (self.vocabulary, initial_prompt) if p) or None
+
+    def _options(self, initial_prompt):
+        temperature = self.config.get_value("whisper", "temperature", 0.0)
+        return {
+            "language": self.config.get_value("whisper", "lang"),
+            "fp16": self.config.get_value("whisper", "use_fp16"),
+            "initial_prompt": self.prompt(initial_prompt),
+            "beam_size": self.config.get_value("whisper", "beam_size", 1),
+            "temperature": tuple(temperature) if isinstance(temperature, list) else temperature,
+            "condition_on_previous_text": self.config.get_value(
+                "whisper", "condition_on_previous_text", True
+            ),
+        }
+
+    def transcribe(self, audio_data, initial_prompt=None):
         if self.model is None:
             return "Error: Model not loaded"
         try:
-            transcript = self.model.transcribe(
-                audio_data,
-                language=self.config.get_value("whisper", "lang"),
-                fp16=self.config.get_value("whisper", "use_fp16"),
-            )
-            return transcript["text"].strip()
+            with tracer.span("transcribe"):
+                text, _ = self.model.transcribe(audio_data, **self._options(initial_prompt))
+            return text
         except Exception as e:
             print(f"Error during transcription: {e}")
             return f"Error: {str(e)}"
+
+    def transcribe_words(self, audio_data, initial_prompt=None, cancelled=None):
+        """Transcribe with word timestamps, returning [(word, start, end), ...].
+
+        Times are in seconds relative to the start of `audio_data`. Returns
+        None on failure so callers can keep their previous hypothesis, and
+        also when `cancelled()` turns true before the decode gets the model.
+        """
+        if self.model is None or (cancelled is not None and cancelled()):
+            return None
+        options = self._options(initial_prompt)
+        options["condition_on_previous_text"] = False
+        try:
+            with tracer.span("transcribe"):
+                _, words = self.model.transcribe(
+                    audio_data, word_timestamps=True, cancelled=cancelled, **options
+                )
+        except Exception as e:
+            print(f"Error during transcription: {e}")
+            return None
+        return None if words is None else [w for w in words if w[0]]
+
+    def transcribe_batch(self, clips, initial_prompt=None):
+        """Transcribe several clips (arrays or file paths) in one batched decode.
+
+        Returns one text per clip, "Error: ..." for a clip that failed. Clips
+        longer than Whisper's 30 s window and empty clips are handled one at
+        a time, and a failed batch falls back to decoding its clips singly.
+        """
+        if self.model is None:
+            return ["Error: Model not loaded"] * len(clips)
+        texts = [None] * len(clips)
+        batch = []
+        for index, clip in enumerate(clips):
+            try:
+                audio = load_audio(clip)
+            except Exception as e:
+                print(f"Error loading audio {clip}: {e}")
+                texts[index] = f"Error: {str(e)}"
+                continue
+            if 0 < len(audio) <= BATCH_SECONDS * SAMPLE_RATE:
+                batch.append((index, audio))
+            else:
+                texts[index] = self.transcribe(audio, initial_prompt)
+        if len(batch) > 1:
+            try:
+                with tracer.span("transcribe_batch"):
+                    decoded = self.model.transcribe_batch(
+                        [audio for _, audio in batch], **self._options(initial_prompt)
+                    )
+                for (index, _), text in zip(batch, decoded):
+                    texts[index] = text
+                batch = []
+            except Exception as e:
+                print(f"Error during batch transcription, decoding one by one: {e}")
+        for index, audio in batch:
+            texts[index] = self.transcribe(audio, initial_prompt)
+        return texts
+
+    def close(self):
+        self.model = None
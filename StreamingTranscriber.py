@@ -0,0 +1,102 @@
+import re
+import threading
+
+
+def _normalize(word):
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+class StreamingTranscriber:
+    """Transcribes the growing recording in the background while space is held.
+
+    A worker thread repeatedly decodes the audio after the last committed
+    word. Words on which two consecutive hypotheses agree are committed and
+    the window start moves past them, so on release only the unconfirmed
+    tail has to be decoded.
+    """
+
+    def __init__(self, recognizer, audio_handler, config):
+        self.recognizer = recognizer
+        self.audio_handler = audio_handler
+        self.rate = audio_handler.rate
+        self.step = config.get_value("whisper", "stream_step", 1.0)
+        self.min_window = int(config.get_value("whisper", "stream_min_window", 1.0) * self.rate)
+        self.max_window = int(config.get_value("whisper", "stream_max_window", 20.0) * self.rate)
+        self.committed = []
+        self.committed_until = 0
+        self.hypothesis = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()  # orders commits against finish()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._worker)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _prompt(self):
+        # Whisper conditions on the previous text; the last few committed
+        # words keep casing and spelling consistent across windows.
+        return " ".join(self.committed[-30:]) or None
+
+    def _worker(self):
+        while not self._stop.wait(self.step):
+            end = self.audio_handler.num_samples
+            if end - self.committed_until < self.min_window:
+                continue
+            audio_data = self.audio_handler.get_audio(self.committed_until, end)
+            words = self.recognizer.transcribe_words(
+                audio_data, self._prompt(), cancelled=self._stop.is_set
+            )
+            if words is None:
+                continue
+            words = [
+                (w, self.committed_until + int(s * self.rate), self.committed_until + int(e * self.rate))
+                for w, s, e in words
+            ]
+            with self._lock:
+                if self._stop.is_set():
+                    return  # finished while decoding; the tail decode covers this audio
+                self._commit(words, end)
+
+    def _commit(self, words, end):
+        agreed = 0
+        for old, new in zip(self.hypothesis, words):
+            if _normalize(old[0]) != _normalize(new[0]):
+                break
+            agreed += 1
+        if agreed == 0 and end - self.committed_until > self.max_window and len(words) > 1:
+            # Nothing is stabilising and the window is getting expensive to
+            # decode: trust everything but the last word.
+            agreed = len(words) - 1
+        if agreed:
+            self.committed.extend(w for w, _, _ in words[:agreed])
+            self.committed_until = words[agreed - 1][2]
+        self.hypothesis = words[agreed:]
+
+    def cancel(self):
+        """Stop the worker without waiting for a decode in progress; its
+        result is dropped when it arrives."""
+        with self._lock:
+            self._stop.set()
+        self._thread = None
+
+    def finish(self, end=None):
+        """Stop the worker and decode only the uncommitted tail.
+
+        A window decode that hasn't reached the model yet is skipped. One
+        already running can't be interrupted: the tail is decoded alongside
+        it with faster-whisper, but waits for it with the whisper engine or
+        a single ASRWorker process.
+        """
+        self.cancel()
+        tail = ""
+        audio_data = self.audio_handler.get_audio(self.committed_until, end)
+        if len(audio_data) >= self.rate * 0.1:
+            tail = self.recognizer.transcribe(audio_data, self._prompt())
+            if tail.startswith("Error:"):
+                if not self.committed:
+                    return tail
+                tail = ""
+        return " ".join(self.committed + [tail]).strip()
@@ -0,0 +1,59 @@
+import queue
+import threading
+import traceback
+import pygame
+
+# Posted on the pygame event queue for every task result and notification.
+# Attributes: name, turn, result, error.
+TASK_EVENT = pygame.event.custom_type()
+
+
+class TaskRunner:
+    """Runs blocking work off the UI thread and reports back through pygame events.
+
+    Tasks are executed in submission order by background workers. When a
+    task finishes, a TASK_EVENT carrying its name, the turn it belongs to
+    and either its result or the exception is posted, so the main loop
+    handles every outcome on the UI thread.
+    """
+
+    def __init__(self, workers=1):
+        self._tasks = queue.Queue()
+        self._threads = []
+        for _ in range(workers):
+            thread = threading.Thread(target=self._worker)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, name, turn, fn, *args, **kwargs):
+        self._tasks.put((name, turn, fn, args, kwargs))
+
+    def notify(self, name, turn=None, result=None, error=None):
+        """Post an event from any thread."""
+        try:
+            pygame.event.post(
+                pygame.event.Event(
+                    TASK_EVENT, name=name, turn=turn, result=result, error=error
+                )
+            )
+        except pygame.error:
+            pass  # display already shut down
+
+    def _worker(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            name, turn, fn, args, kwargs = task
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                traceback.print_exc()
+                self.notify(name, turn, error=e)
+            else:
+                self.notify(name, turn, result=result)
+
+    def stop(self):
+        for _ in self._threads:
+            self._tasks.put(None)
@@ -1,33 +1,189 @@
-import gtts
 import pygame
-import tempfile
+import io
+import shutil
+import subprocess
+import threading
+import time
+from collections import OrderedDict
 import numpy as np
-import os
+
+from Tracer import tracer
+
+
+VOICE_LANGUAGES = {"english": "en", "french": "fr", "german": "de", "spanish": "es"}
+
+
+def to_mixer_sound(pcm, rate):
+    """Build a mixer Sound from mono int16 PCM, resampling if needed."""
+    mixer_rate, _, mixer_channels = pygame.mixer.get_init()
+    if rate != mixer_rate and len(pcm):
+        positions = np.arange(int(len(pcm) * mixer_rate / rate)) * (rate / mixer_rate)
+        pcm = np.interp(positions, np.arange(len(pcm)), pcm).astype(np.int16)
+    if mixer_channels > 1:
+        pcm = np.repeat(pcm[:, None], mixer_channels, axis=1)
+    return pygame.mixer.Sound(buffer=np.ascontiguousarray(pcm))
+
+
+class GTTSBackend:
+    """Google TTS over the network, decoded in memory."""
+
+    name = "gtts"
+
+    def __init__(self, voice, rate):
+        self.lang = VOICE_LANGUAGES.get(voice, voice if len(voice) == 2 else "en")
+        self.slow = rate < 120  # gTTS only has normal and slow speeds
+
+    def synthesize(self, text):
+        import gtts  # only needed for this backend
+
+        audio = io.BytesIO()
+        gtts.gTTS(text=text, lang=self.lang, slow=self.slow).write_to_fp(audio)
+        audio.seek(0)
+        return pygame.mixer.Sound(file=audio)
+
+
+class EspeakBackend:
+    """Local espeak-ng synthesis; WAV is read from stdout, no files touched."""
+
+    name = "espeak"
+
+    def __init__(self, voice, rate):
+        self.binary = shutil.which("espeak-ng") or shutil.which("espeak")
+        self.voice = VOICE_LANGUAGES.get(voice, voice)
+        self.rate = rate
+
+    def synthesize(self, text):
+        wav = subprocess.run(
+            [self.binary, "--stdout", "-v", self.voice, "-s", str(int(self.rate)), text],
+            capture_output=True,
+            check=True,
+        ).stdout
+        rate = int.from_bytes(wav[24:28], "little")
+        data = wav.find(b"data") + 8
+        usable = (len(wav) - data) // 2 * 2
+        pcm = np.frombuffer(wav[data : data + usable], dtype=np.int16)
+        return to_mixer_sound(pcm, rate)
+
+
+BACKENDS = {"gtts": GTTSBackend, "espeak": EspeakBackend}
+
+
+class Utterance:
+    """A synthesized Sound with its decoded PCM and RMS level envelope.
+
+    The envelope holds one RMS value per `hop` samples and is computed once
+    when the utterance is synthesized, so metering during playback is a
+    plain index lookup.
+    """
+
+    def __init__(self, sound, hop=1024):
+        self.sound = sound
+        self.pcm = pygame.sndarray.array(sound)
+        self.rate = pygame.mixer.get_init()[0]
+        self.hop_seconds = hop / self.rate
+        mono = self.pcm if self.pcm.ndim == 1 else self.pcm.mean(axis=1)
+        frames = len(mono) // hop
+        blocks = mono[: frames * hop].reshape(frames, hop).astype(np.float32) / 32768.0
+        self.envelope = np.sqrt(np.mean(blocks * blocks, axis=1))
 
 
 class TextToSpeech:
-    """Handles text-to-speech functionality using gTTS and Pygame mixer"""
+    """Handles text-to-speech functionality using pluggable engines and Pygame mixer
+
+    Utterances are synthesized straight into `pygame.mixer.Sound` objects
+    and kept in an LRU cache keyed on the text and voice settings, so
+    repeated phrases play without synthesizing again.
+    """
 
     def __init__(self, config):
         self.config = config
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+        self.rate = config.get_value("tts", "rate", 145)
+        self.volume = config.get_value("tts", "volume", 1.0)
+        self.voice = config.get_value("tts", "voice_preference", "english")
+        self.backend = self._create_backend(config.get_value("tts", "engine", "gtts"))
+        self.cache_size = config.get_value("tts", "cache_size", 64)
+        self.cache = OrderedDict()
+        self.cache_lock = threading.Lock()
+        pygame.mixer.set_reserved(1)
+        self.channel = pygame.mixer.Channel(0)
+        self._stopped = threading.Event()
+        self.current = None
+        self.started_at = 0.0
 
-    def speak(self, text, ui_callback=None):
+    def _create_backend(self, engine):
+        backend = BACKENDS.get(engine)
+        if backend is None:
+            print(f"Warning: unknown TTS engine '{engine}', using gtts.")
+            backend = GTTSBackend
+        if backend is EspeakBackend and not (
+            shutil.which("espeak-ng") or shutil.which("espeak")
+        ):
+            print("Warning: espeak-ng is not installed, using gtts.")
+            backend = GTTSBackend
+        return backend(self.voice, self.rate)
+
+    def synthesize(self, text):
+        """Synthesize text into an Utterance, safe to call from any thread."""
         if not text:
+            return None
+        key = (self.backend.name, self.voice, self.rate, self.volume, text)
+        with self.cache_lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                tracer.add("synthesize_cached", 0.0)
+                return self.cache[key]
+        try:
+            with tracer.span("synthesize"):
+                utterance = Utterance(self.backend.synthesize(text))
+        except Exception as e:
+            print(f"Error during speech generation: {e}")
+            return None
+        utterance.sound.set_volume(self.volume)
+        with self.cache_lock:
+            self.cache[key] = utterance
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return utterance
+
+    def play(self, utterance):
+        """Play an Utterance, blocking until it ends or `stop` is called."""
+        if utterance is None:
             return
         try:
-            tts = gtts.gTTS(text=text, lang="en")
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
-            temp_file.close()
-            tts.save(temp_file.name)
-            pygame.mixer.music.load(temp_file.name)
-            pygame.mixer.music.play()
-            while pygame.mixer.music.get_busy():
-                if ui_callback:
-                    ui_callback(np.zeros(1024, dtype=np.float32))
-                pygame.time.Clock().tick(10)
-            os.remove(temp_file.name)
+            self._stopped.clear()
+            with tracer.span("playback"):
+                self.channel.play(utterance.sound)
+                tracer.mark("first_audio")
+                self.started_at = time.monotonic()
+                self.current = utterance
+                while self.channel.get_busy() and not self._stopped.wait(0.05):
+                    pass
         except Exception as e:
-            print(f"Error during speech generation or playback: {e}")
+            print(f"Error during speech playback: {e}")
+        finally:
+            self.current = None
+
+    def levels(self, count):
+        """Return the last `count` envelope values up to the playback position.
+
+        Cheap enough to call from the UI thread every frame; returns zeros
+        when nothing is playing.
+        """
+        utterance = self.current
+        out = np.zeros(count, dtype=np.float32)
+        if utterance is None or len(utterance.envelope) == 0:
+            return out
+        position = int((time.monotonic() - self.started_at) / utterance.hop_seconds)
+        position = min(position, len(utterance.envelope) - 1)
+        window = utterance.envelope[max(0, position + 1 - count) : position + 1]
+        out[count - len(window) :] = window
+        return out
+
+    def speak(self, text):
+        self.play(self.synthesize(text))
 
     def stop(self):
-        pygame.mixer.music.stop()
+        self._stopped.set()
+        self.channel.stop()
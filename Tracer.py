@@ -0,0 +1,197 @@
+"""Per-turn latency tracing.
+
+Components time their work with the module-level `tracer`:
+
+    with tracer.span("transcribe"):
+        ...
+    tracer.mark("first_token")
+    tracer.set("eval_count", 42)
+
+Spans and marks land in the trace of the turn in progress, which the
+assistant opens when recording stops and closes when the answer has been
+spoken. Each closed turn is one JSON line in a rotating log. While tracing
+is disabled every call returns immediately.
+
+Run `python Tracer.py [path]` for p50/p95 per stage.
+"""
+
+import argparse
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+import numpy as np
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Trace:
+    """Timings of one turn: summed spans, first-time marks and raw fields."""
+
+    def __init__(self, turn):
+        self.turn = turn
+        self.started = time.perf_counter()
+        self.wall_time = time.time()
+        self.spans: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+        self.marks: dict[str, float] = {}
+        self.fields: dict = {}
+        self.lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self.lock:
+            self.spans[name] = self.spans.get(name, 0.0) + seconds
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def mark(self, name):
+        with self.lock:
+            self.marks.setdefault(name, time.perf_counter() - self.started)
+
+    def record(self, outcome):
+        def ms(seconds):
+            return round(1000 * seconds, 2)
+
+        with self.lock:
+            return {
+                "turn": self.turn,
+                "time": self.wall_time,
+                "outcome": outcome,
+                "total_ms": ms(time.perf_counter() - self.started),
+                "spans": {name: ms(t) for name, t in self.spans.items()},
+                "counts": dict(self.counts),
+                "marks": {name: ms(t) for name, t in self.marks.items()},
+                "fields": dict(self.fields),
+            }
+
+
+class _Span:
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Tracer:
+    """Collects spans for the current turn; a no-op until enabled."""
+
+    def __init__(self):
+        self.enabled = False
+        self.current: Trace | None = None
+        self._logger = None
+
+    def configure(self, config):
+        self.enabled = config.get_value("tracing", "enabled", False)
+        if not self.enabled:
+            return
+        path = config.get_value("tracing", "path", ".revira/traces.jsonl")
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            path,
+            maxBytes=config.get_value("tracing", "max_bytes", 1_048_576),
+            backupCount=config.get_value("tracing", "backups", 3),
+            encoding="utf-8",
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self._logger = logging.getLogger("revira.trace")
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        self._logger.handlers[:] = [handler]
+
+    def begin(self, turn):
+        if self.enabled:
+            self.current = Trace(turn)
+
+    def end(self, outcome="answered"):
+        """Write the current turn's record, if one is open."""
+        trace, self.current = self.current, None
+        if trace is not None and self._logger is not None:
+            self._logger.info(json.dumps(trace.record(outcome)))
+
+    def span(self, name):
+        trace = self.current
+        return NULL_SPAN if trace is None else _Span(trace, name)
+
+    def add(self, name, seconds):
+        """Record a duration measured elsewhere."""
+        trace = self.current
+        if trace is not None:
+            trace.add(name, seconds)
+
+    def mark(self, name):
+        """Note the first time `name` happens in this turn."""
+        trace = self.current
+        if trace is not None:
+            trace.mark(name)
+
+    def set(self, key, value):
+        trace = self.current
+        if trace is not None:
+            trace.fields[key] = value
+
+
+tracer = Tracer()
+
+
+def summarize(paths):
+    """Return {stage: [milliseconds, ...]} over all records in `paths`."""
+    stages: dict[str, list[float]] = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                stages.setdefault("total", []).append(record["total_ms"])
+                for name, ms in record.get("spans", {}).items():
+                    stages.setdefault(name, []).append(ms)
+                for name, ms in record.get("marks", {}).items():
+                    stages.setdefault(f"@{name}", []).append(ms)
+                tokens_per_second = record.get("fields", {}).get("tokens_per_second")
+                if tokens_per_second is not None:
+                    stages.setdefault("tokens/s", []).append(tokens_per_second)
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize per-turn latency traces.")
+    parser.add_argument("path", nargs="?", default=".revira/traces.jsonl")
+    args = parser.parse_args()
+    paths = [args.path] + [
+        f"{args.path}.{i}" for i in range(1, 100) if os.path.exists(f"{args.path}.{i}")
+    ]
+    paths = [path for path in paths if os.path.exists(path)]
+    if not paths:
+        print(f"No traces at {args.path}")
+        return
+    stages = summarize(paths)
+    print(f"{'stage':<20} {'n':>5} {'p50':>10} {'p95':>10}")
+    for name, values in stages.items():
+        p50, p95 = np.percentile(values, [50, 95])
+        print(f"{name:<20} {len(values):>5} {p50:>10.1f} {p95:>10.1f}")
+    print("Times in ms; @stage = time since recording stopped.")
+
+
+if __name__ == "__main__":
+    main()
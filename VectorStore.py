@@ -0,0 +1,129 @@
+import threading
+import time
+
+
+class VectorStore:
+    """Long-lived handle on the Chroma collection used for retrieval.
+
+    The HTTP client and collection handle are created on first use and
+    reused for every query. If a call fails, both are dropped and the call
+    is retried once on a fresh connection, so a restarted Chroma server is
+    picked up transparently. Per-operation timings are kept in `stats`.
+    """
+
+    def __init__(self, config):
+        self.host = config.get_value("vectorstore", "host", "localhost")
+        self.port = config.get_value("vectorstore", "port", 8000)
+        self.collection_name = config.get_value("vectorstore", "collection", "user_tt")
+        self._client = None
+        self._collection = None
+        self._lock = threading.Lock()
+        self.stats = {}
+        self.version = 0  # bumped on every write, so derived indexes can refresh
+
+    def _get_collection(self):
+        with self._lock:
+            if self._collection is None:
+                if self._client is None:
+                    import chromadb  # only needed for the server backend
+
+                    self._client = chromadb.HttpClient(host=self.host, port=self.port)
+                self._collection = self._client.get_or_create_collection(
+                    name=self.collection_name,
+                    metadata={"hnsw:space": "cosine"},
+                )
+            return self._collection
+
+    def _disconnect(self):
+        with self._lock:
+            self._client = None
+            self._collection = None
+
+    def _record(self, operation, elapsed):
+        count, total, _ = self.stats.get(operation, (0, 0.0, 0.0))
+        self.stats[operation] = (count + 1, total + elapsed, elapsed)
+
+    def _call(self, operation, fn):
+        start = time.perf_counter()
+        try:
+            try:
+                return fn(self._get_collection())
+            except Exception as e:
+                print(f"Vector store {operation} failed ({e}), reconnecting...")
+                self._disconnect()
+                return fn(self._get_collection())
+        finally:
+            self._record(operation, time.perf_counter() - start)
+
+    def connect(self):
+        """Open the connection now rather than on the first query."""
+        return self._call("connect", lambda c: c.count())
+
+    def query(self, query_embeddings, n_results=10, where=None):
+        return self._call(
+            "query",
+            lambda c: c.query(
+                query_embeddings=query_embeddings, n_results=n_results, where=where
+            ),
+        )
+
+    def upsert(self, ids, documents, embeddings, metadatas=None):
+        if not ids:
+            return
+        self.version += 1
+        return self._call(
+            "upsert",
+            lambda c: c.upsert(
+                ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas
+            ),
+        )
+
+    def update(self, ids, metadatas):
+        """Replace the metadata of existing documents, keeping their embeddings."""
+        if not ids:
+            return
+        self.version += 1
+        return self._call("update", lambda c: c.update(ids=ids, metadatas=metadatas))
+
+    def delete(self, ids=None, where=None):
+        if ids is None and where is None:
+            raise ValueError("delete() needs ids or where; use clear() to empty the store")
+        if ids is not None and not ids:
+            return
+        self.version += 1
+        return self._call("delete", lambda c: c.delete(ids=ids, where=where))
+
+    def get(self, ids=None, where=None, include=("documents", "metadatas")):
+        return self._call(
+            "get", lambda c: c.get(ids=ids, where=where, include=list(include))
+        )
+
+    def clear(self):
+        """Drop every document in the collection."""
+
+        def recreate(_):
+            self._client.delete_collection(self.collection_name)
+            self._disconnect()
+
+        self.version += 1
+        self._call("clear", recreate)
+
+    def timing_summary(self):
+        return {
+            operation: {
+                "count": count,
+                "mean_ms": 1000 * total / count,
+                "last_ms": 1000 * last,
+            }
+            for operation, (count, total, last) in self.stats.items()
+        }
+
+
+def create_vector_store(config):
+    """Build the retrieval backend selected by `[vectorstore] backend`."""
+    backend = config.get_value("vectorstore", "backend", "chroma")
+    if backend == "local":
+        from LocalVectorStore import LocalVectorStore
+
+        return LocalVectorStore(config)
+    return VectorStore(config)
@@ -0,0 +1,124 @@
+import numpy as np
+
+
+class VoiceActivityDetector:
+    """Energy / zero-crossing voice activity detection on int16 blocks.
+
+    `process` is cheap enough to run on every audio callback block; it keeps
+    one speech flag per block and an adaptive noise floor. After recording,
+    `speech_bounds` gives the sample range to keep once leading and trailing
+    silence is trimmed.
+    """
+
+    def __init__(self, config, rate, chunk, max_blocks):
+        self.rate = rate
+        self.chunk = chunk
+        self.max_blocks = max_blocks
+        self.flags = np.zeros(max_blocks, dtype=bool)
+        self._samples = np.zeros(chunk, dtype=np.float32)
+        self._signs = np.zeros(chunk, dtype=bool)
+        self._crossings = np.zeros(chunk - 1, dtype=bool)
+        self.energy_threshold = config.get_value("vad", "energy_threshold", -50.0)
+        self.noise_margin = config.get_value("vad", "noise_margin", 10.0)
+        self.max_zcr = config.get_value("vad", "max_zcr", 0.35)
+        self.min_speech_blocks = self._ms_to_blocks(config.get_value("vad", "min_speech_ms", 250))
+        self.padding_blocks = self._ms_to_blocks(config.get_value("vad", "padding_ms", 200))
+        self.endpoint_blocks = self._ms_to_blocks(config.get_value("vad", "endpoint_ms", 800))
+        self.max_silence_blocks = self._ms_to_blocks(
+            config.get_value("vad", "max_silence_ms", 8000)
+        )
+        self.reset()
+
+    def _ms_to_blocks(self, ms):
+        return max(1, int(round(ms * self.rate / 1000 / self.chunk)))
+
+    def reset(self):
+        self.num_blocks = 0
+        self.noise_floor = None
+        self.speech_blocks = 0
+        self.silence_run = 0
+
+    @staticmethod
+    def frame_features(samples, frame_size):
+        """Vectorised per-frame energy (dBFS) and zero-crossing rate."""
+        n = len(samples) // frame_size
+        frames = samples[: n * frame_size].reshape(n, frame_size).astype(np.float32)
+        power = np.einsum("ij,ij->i", frames, frames) / frame_size
+        energy = 10.0 * np.log10(power / (32768.0 * 32768.0) + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame_size
+        return energy, zcr
+
+    def _classify(self, energy, zcr):
+        if self.noise_floor is None:
+            self.noise_floor = energy
+        threshold = max(self.energy_threshold, self.noise_floor + self.noise_margin)
+        # Loud frames are speech regardless of ZCR; quieter ones must also
+        # look voiced rather than like hiss.
+        is_speech = energy > threshold and (
+            zcr < self.max_zcr or energy > threshold + self.noise_margin
+        )
+        if not is_speech:
+            self.noise_floor = min(energy, 0.95 * self.noise_floor + 0.05 * energy)
+        return is_speech
+
+    def process(self, block):
+        """Classify one callback block without allocating arrays."""
+        samples = self._samples[: len(block)]
+        np.copyto(samples, block, casting="unsafe")
+        power = float(np.dot(samples, samples)) / len(block)
+        energy = 10.0 * np.log10(power / (32768.0 * 32768.0) + 1e-10)
+        signs = np.signbit(samples, out=self._signs[: len(block)])
+        crossings = np.not_equal(
+            signs[1:], signs[:-1], out=self._crossings[: len(block) - 1]
+        )
+        zcr = np.count_nonzero(crossings) / len(block)
+        is_speech = self._classify(energy, zcr)
+        self.flags[self.num_blocks % self.max_blocks] = is_speech
+        self.num_blocks += 1
+        if is_speech:
+            self.speech_blocks += 1
+            self.silence_run = 0
+        else:
+            self.silence_run += 1
+        return is_speech
+
+    @property
+    def endpoint_reached(self):
+        """True once speech has been heard and has been followed by silence."""
+        return (
+            self.speech_blocks >= self.min_speech_blocks
+            and self.silence_run >= self.endpoint_blocks
+        )
+
+    @property
+    def timed_out(self):
+        """True when no speech has been heard within `max_silence_ms` of the start."""
+        return (
+            self.speech_blocks < self.min_speech_blocks
+            and self.num_blocks >= self.max_silence_blocks
+        )
+
+    def speech_bounds(self):
+        """Absolute sample range [start, end) containing speech, or None.
+
+        Only blocks still held by the audio ring buffer are considered.
+        """
+        if self.speech_blocks < self.min_speech_blocks:
+            return None
+        first_block = max(0, self.num_blocks - self.max_blocks)
+        order = np.arange(first_block, self.num_blocks)
+        speech = order[self.flags[order % self.max_blocks]]
+        if len(speech) == 0:
+            return None
+        first = max(first_block, speech[0] - self.padding_blocks)
+        last = min(self.num_blocks, speech[-1] + 1 + self.padding_blocks)
+        return int(first) * self.chunk, int(last) * self.chunk
+
+    def stats(self, total_samples):
+        bounds = self.speech_bounds()
+        kept = bounds[1] - bounds[0] if bounds else 0
+        return {
+            "speech_ratio": self.speech_blocks / self.num_blocks if self.num_blocks else 0.0,
+            "trimmed_ms": int((total_samples - kept) * 1000 / self.rate),
+        }
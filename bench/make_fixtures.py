@@ -0,0 +1,147 @@
+"""Record the fixtures used by `bench.run`; commit everything it writes.
+
+    python -m bench.make_fixtures --ollama http://localhost:11434 --whisper-model tiny
+
+Each question in fixtures/questions.jsonl gets a WAV file in fixtures/wav/
+spoken with espeak-ng. Recordings of real voices can be dropped in under
+the same names instead. From the Ollama server, the /api/generate stream
+of each question and the real embeddings of the questions and of the
+corpus chunks (cut with the [ingest] settings of config.toml) are
+recorded for the stub to replay. --whisper-model loads the model once so
+it is in the local cache, because the benchmark never downloads anything.
+Finally fixtures/manifest.json records a hash of every fixture file and
+the settings they were made with; `bench.run` refuses to run on fixtures
+that don't match it.
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import time
+
+from ConfigParser import ConfigParser
+from OllamaStubServer import record_embed, record_generate
+from rag.rag import EMBED_MODEL, iter_chunks, iter_document
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(BENCH_DIR, "fixtures")
+MANIFEST = os.path.join(FIXTURES, "manifest.json")
+CORPUS = os.path.join(os.path.dirname(BENCH_DIR), "examples", "timetable_example.txt")
+CONFIG_FILEPATH = os.path.join(os.path.dirname(BENCH_DIR), "config.toml")
+
+
+def load_questions(path=os.path.join(FIXTURES, "questions.jsonl")):
+    with open(path, "r", encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def chunk_settings(config):
+    return {
+        "chunk_tokens": config.get_value("ingest", "chunk_tokens", 200),
+        "chunk_overlap": config.get_value("ingest", "chunk_overlap", 40),
+    }
+
+
+def corpus_chunks(settings):
+    """The chunk texts the benchmark will embed when it ingests CORPUS."""
+    pages = iter_document(CORPUS)
+    return [
+        chunk.text
+        for chunk in iter_chunks(pages, settings["chunk_tokens"], settings["chunk_overlap"])
+    ]
+
+
+def fixture_files():
+    """Fixture paths, relative to FIXTURES, that the manifest covers."""
+    paths = ["questions.jsonl", "generate.ndjson", "embed.ndjson"]
+    pattern = os.path.join(FIXTURES, "wav", "*.wav")
+    paths += sorted(os.path.relpath(path, FIXTURES) for path in glob.glob(pattern))
+    return paths
+
+
+def file_hashes():
+    hashes = {}
+    for name in fixture_files():
+        path = os.path.join(FIXTURES, name)
+        if os.path.exists(path):
+            with open(path, "rb") as file:
+                hashes[name] = hashlib.sha256(file.read()).hexdigest()
+    return hashes
+
+
+def speak_questions(questions, wav_dir, voice="en", rate=150):
+    missing = [
+        question
+        for question in questions
+        if not os.path.exists(os.path.join(wav_dir, f"{question['id']}.wav"))
+    ]
+    if not missing:
+        return
+    binary = shutil.which("espeak-ng") or shutil.which("espeak")
+    if binary is None:
+        raise SystemExit("espeak-ng is needed to generate WAV fixtures.")
+    os.makedirs(wav_dir, exist_ok=True)
+    for question in missing:
+        path = os.path.join(wav_dir, f"{question['id']}.wav")
+        subprocess.run(
+            [binary, "-v", voice, "-s", str(rate), "-w", path, question["text"]],
+            check=True,
+        )
+        print(f"Wrote {path}")
+
+
+def prefetch_whisper(config, model):
+    """Load the model once so later offline runs find it in the cache."""
+    from SpeechRecognizer import SpeechRecognizer
+
+    config.config.setdefault("whisper", {})["model_path"] = model
+    if not SpeechRecognizer(config).load_model():
+        raise SystemExit(f"Couldn't load Whisper model {model}.")
+    print(f"Cached Whisper model {model}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ollama", required=True, help="record streams from this Ollama server")
+    parser.add_argument("--model", default="deepseek-r1:1.5b")
+    parser.add_argument("--whisper-model", help="Whisper model to fetch into the local cache")
+    args = parser.parse_args()
+
+    config = ConfigParser(CONFIG_FILEPATH)
+    config.read_config()
+    questions = load_questions()
+    speak_questions(questions, os.path.join(FIXTURES, "wav"))
+
+    texts = [q["text"] for q in questions]
+    settings = chunk_settings(config)
+    generate_path = os.path.join(FIXTURES, "generate.ndjson")
+    embed_path = os.path.join(FIXTURES, "embed.ndjson")
+    for path in (generate_path, embed_path):
+        if os.path.exists(path):
+            os.remove(path)
+    record_generate(args.ollama, args.model, texts, generate_path)
+    chunks = corpus_chunks(settings)
+    record_embed(args.ollama, EMBED_MODEL, texts + chunks, embed_path)
+    print(f"Recorded {len(texts)} streams and {len(texts) + len(chunks)} embeddings")
+
+    if args.whisper_model:
+        prefetch_whisper(config, args.whisper_model)
+
+    manifest = {
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "model": args.model,
+        "embed_model": EMBED_MODEL,
+        **settings,
+        "files": file_hashes(),
+    }
+    with open(MANIFEST, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2)
+    print(f"Wrote {MANIFEST}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+"""Offline end-to-end benchmark of the voice pipeline.
+
+    python -m bench.run                          # run and compare to the baseline
+    python -m bench.run --save-baseline          # record a new baseline
+    python -m bench.run --no-asr --no-tts        # retrieval and generation only
+
+Each WAV fixture is fed through the real AudioHandler in microphone-sized
+blocks, transcribed by SpeechRecognizer, answered through retrieval over
+examples/timetable_example.txt and OllamaConnector, and synthesized by
+TextToSpeech (without playback). Ollama is replaced by OllamaStubServer
+replaying the streams and embeddings recorded by `bench.make_fixtures`
+with fixed token timing, so runs are reproducible without a GPU or
+network. Retrieval embeds the reference question text, whose recorded
+embedding is in the fixtures; the transcript is scored by word error
+rate. Any text without a recorded embedding, fixtures that don't match
+fixtures/manifest.json, a Whisper model missing from the local cache and
+a missing baseline are all errors. Per-stage timings come from the
+tracer. The run fails if any stage's p50, the throughput or the peak RSS
+is worse than the baseline by more than --threshold.
+"""
+
+import os
+
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")  # synthesize without a sound card
+os.environ.setdefault("HF_HUB_OFFLINE", "1")  # use cached models, never download
+
+import argparse
+import hashlib
+import json
+import platform
+import resource
+import sys
+import tempfile
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from AudioHandler import AudioHandler
+from ConfigParser import ConfigParser
+from DocumentIngestor import DocumentIngestor
+from OllamaConnector import OllamaConnector
+from OllamaStubServer import OllamaStubServer, load_embeddings, load_streams
+from Retriever import Retriever
+from SpeechRecognizer import SpeechRecognizer
+from Tracer import summarize, tracer
+from VectorStore import create_vector_store
+from bench.make_fixtures import (
+    BENCH_DIR,
+    CORPUS,
+    FIXTURES,
+    MANIFEST,
+    chunk_settings,
+    file_hashes,
+    load_questions,
+)
+from rag.embedder import Embedder
+from rag.rag import EMBED_MODEL
+from rag.registry import DocumentRegistry
+
+CONFIG_FILEPATH = os.path.join(os.path.dirname(BENCH_DIR), "config.toml")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baselines", "default.json")
+
+
+def override(config, section, key, value):
+    """Change a setting for this run only; ConfigParser.set_value would save it."""
+    config.config.setdefault(section, {})[key] = value
+
+
+def load_wav(path, rate):
+    """Read a WAV file as mono int16 at `rate` Hz."""
+    with wave.open(path, "rb") as file:
+        source_rate = file.getframerate()
+        channels = file.getnchannels()
+        width = file.getsampwidth()
+        frames = file.readframes(file.getnframes())
+    if width != 2:
+        raise ValueError(f"{path}: only 16-bit WAV files are supported")
+    samples = np.frombuffer(frames, dtype=np.int16).reshape(-1, channels)
+    samples = samples.mean(axis=1)
+    if source_rate != rate:
+        positions = np.arange(0, len(samples), source_rate / rate)
+        samples = np.interp(positions, np.arange(len(samples)), samples)
+    return samples.astype(np.int16)
+
+
+def check_fixtures(config):
+    """Exit unless the fixtures are complete and match the manifest; returns its digest."""
+    record = "run python -m bench.make_fixtures --ollama URL and commit fixtures/"
+    if not os.path.exists(MANIFEST):
+        raise SystemExit(f"Missing {MANIFEST}; {record}")
+    with open(MANIFEST, "rb") as file:
+        data = file.read()
+    manifest = json.loads(data)
+    for name in ("generate.ndjson", "embed.ndjson"):
+        if not os.path.exists(os.path.join(FIXTURES, name)):
+            raise SystemExit(f"Missing fixtures/{name}; {record}")
+    if file_hashes() != manifest["files"]:
+        raise SystemExit(f"Fixtures differ from {MANIFEST}; {record}")
+    settings = chunk_settings(config)
+    if any(manifest.get(key) != value for key, value in settings.items()):
+        raise SystemExit(
+            f"Embeddings were recorded for chunking {manifest.get('chunk_tokens')}/"
+            f"{manifest.get('chunk_overlap')}, config.toml has "
+            f"{settings['chunk_tokens']}/{settings['chunk_overlap']}; {record}"
+        )
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def word_error_rate(reference, hypothesis):
+    ref = reference.lower().split()
+    hyp = hypothesis.lower().split()
+    row = list(range(len(hyp) + 1))
+    for i, word in enumerate(ref, 1):
+        previous, row[0] = row[0], i
+        for j, other in enumerate(hyp, 1):
+            previous, row[j] = row[j], min(
+                row[j] + 1, row[j - 1] + 1, previous + (word.strip("?.,!") != other.strip("?.,!"))
+            )
+    return row[-1] / max(len(ref), 1)
+
+
+class Bench:
+    def __init__(self, args, workdir):
+        self.args = args
+        config = ConfigParser(CONFIG_FILEPATH)
+        config.read_config()
+        self.config = config
+        self.fixtures = check_fixtures(config)
+        self.stub = OllamaStubServer(
+            token_delay=args.token_delay,
+            first_token_delay=args.first_token_delay,
+            generate_streams=load_streams(os.path.join(FIXTURES, "generate.ndjson")),
+            embeddings=load_embeddings(os.path.join(FIXTURES, "embed.ndjson")),
+            strict_embeddings=True,
+        ).start()
+        override(config, "ollama", "url", f"{self.stub.url}/api/generate")
+        override(config, "vectorstore", "backend", "local")
+        override(config, "vectorstore", "index_path", os.path.join(workdir, "index"))
+        override(config, "whisper", "model_path", args.whisper_model)
+        override(config, "tracing", "enabled", True)
+        override(config, "tracing", "path", os.path.join(workdir, "traces.jsonl"))
+        tracer.configure(config)
+        self.trace_path = os.path.join(workdir, "traces.jsonl")
+
+        self.audio = AudioHandler(config)
+        self.recognizer = None if args.no_asr else SpeechRecognizer(config)
+        self.ollama = OllamaConnector(config)
+        self.embedder = Embedder(
+            EMBED_MODEL,
+            batch_size=config.get_value("embedding", "batch_size", 32),
+            workers=config.get_value("embedding", "workers", 2),
+            host=self.stub.url,
+        )
+        self.vector_store = create_vector_store(config)
+        self.ingestor = DocumentIngestor(
+            self.vector_store,
+            self.embedder,
+            DocumentRegistry(os.path.join(workdir, "documents.json")),
+            status=lambda message: None,
+            chunk_tokens=config.get_value("ingest", "chunk_tokens", 200),
+            chunk_overlap=config.get_value("ingest", "chunk_overlap", 40),
+        )
+        self.retriever = Retriever(self.vector_store, self.embedder, config)
+        self.tts = None
+        if not args.no_tts:
+            from TextToSpeech import TextToSpeech
+
+            self.tts = TextToSpeech(config)
+        self.synth_pool = ThreadPoolExecutor(
+            max_workers=config.get_value("tts", "synth_workers", 2)
+        )
+
+    def setup(self):
+        """Load models and ingest the corpus; returns timings in ms."""
+        timings = {}
+        if self.recognizer:
+            start = time.perf_counter()
+            if not self.recognizer.load_model():
+                raise SystemExit("Couldn't load the Whisper model.")
+            timings["load_whisper"] = 1000 * (time.perf_counter() - start)
+        start = time.perf_counter()
+        self.ingestor.ingest_file(CORPUS)
+        self.retriever.warm_up()
+        if self.recognizer:
+            self.recognizer.set_vocabulary(self.retriever.documents())
+        timings["ingest"] = 1000 * (time.perf_counter() - start)
+        return timings
+
+    def turn(self, turn, question):
+        """Run one question through the pipeline; returns the transcription."""
+        tracer.begin(turn)
+        if self.recognizer:
+            samples = load_wav(question["wav"], self.audio.rate)
+            self.audio.reset()
+            chunk = self.audio.chunk
+            for i in range(0, len(samples) - chunk + 1, chunk):
+                block = samples[i : i + chunk, None]
+                self.audio.callback(block, chunk, None, None)
+            with tracer.span("stop_audio"):
+                clip = self.audio.stop_recording()
+            text = self.recognizer.transcribe(clip) if len(clip) else ""
+        else:
+            text = question["text"]
+        # Retrieve with the reference text: its embedding is recorded, and
+        # ASR quality is measured separately by the word error rate.
+        with tracer.span("embed_query"):
+            embedding = self.embedder.embed_query(question["text"])
+        prompt, _ = self.retriever.build_prompt(question["text"], embedding)
+
+        futures = []
+
+        def synthesize(segment):
+            self.tts.synthesize(segment)
+            tracer.mark("first_audio")
+
+        def on_segment(segment):
+            if self.tts:
+                futures.append(self.synth_pool.submit(synthesize, segment))
+
+        self.ollama.generate_response(prompt, on_segment)
+        for future in futures:
+            future.result()
+        tracer.end("answered")
+        return text
+
+    def run(self):
+        questions = load_questions()
+        if self.recognizer:
+            for question in questions:
+                question["wav"] = os.path.join(FIXTURES, "wav", f"{question['id']}.wav")
+                if not os.path.exists(question["wav"]):
+                    raise SystemExit(
+                        f"Missing {question['wav']}; run python -m bench.make_fixtures"
+                    )
+        results = {"setup_ms": self.setup()}
+        errors = []
+        start = time.perf_counter()
+        turn = 0
+        for _ in range(self.args.repeat):
+            for question in questions:
+                text = self.turn(turn, question)
+                errors.append(word_error_rate(question["text"], text))
+                turn += 1
+        elapsed = time.perf_counter() - start
+
+        stages = summarize([self.trace_path])
+        results["stages"] = {
+            name: {
+                "n": len(values),
+                "p50": float(np.percentile(values, 50)),
+                "p95": float(np.percentile(values, 95)),
+            }
+            for name, values in stages.items()
+        }
+        results["turns"] = turn
+        results["throughput_qps"] = turn / elapsed
+        results["wer"] = float(np.mean(errors)) if self.recognizer else None
+        # ru_maxrss is in KiB on Linux and bytes on macOS.
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        results["peak_rss_mb"] = rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+        results["meta"] = {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "whisper_model": None if self.args.no_asr else self.args.whisper_model,
+            "whisper_engine": (
+                None if self.args.no_asr else self.config.get_value("whisper", "engine", "whisper")
+            ),
+            "tts": not self.args.no_tts,
+            "token_delay": self.args.token_delay,
+            "first_token_delay": self.args.first_token_delay,
+            "repeat": self.args.repeat,
+            "fixtures": self.fixtures,
+        }
+        return results
+
+    def close(self):
+        self.synth_pool.shutdown()
+        self.ollama.close()
+        self.embedder.close()
+        self.stub.stop()
+
+
+def print_results(results):
+    print(f"{'stage':<22} {'n':>5} {'p50 ms':>10} {'p95 ms':>10}")
+    for name, stage in results["stages"].items():
+        print(f"{name:<22} {stage['n']:>5} {stage['p50']:>10.1f} {stage['p95']:>10.1f}")
+    for name, ms in results["setup_ms"].items():
+        print(f"{name:<22} {ms:>27.1f}")
+    print(f"throughput: {results['throughput_qps']:.2f} questions/s over {results['turns']} turns")
+    print(f"peak RSS: {results['peak_rss_mb']:.0f} MB")
+    if results["wer"] is not None:
+        print(f"word error rate: {100 * results['wer']:.1f}%")
+
+
+def regressions(results, baseline, threshold, min_ms=1.0):
+    """Describe every metric worse than the baseline by more than `threshold`."""
+    found = []
+    for name, stage in baseline.get("stages", {}).items():
+        current = results["stages"].get(name)
+        if current is None or name == "tokens/s" or stage["p50"] < min_ms:
+            continue
+        if current["p50"] > stage["p50"] * (1 + threshold):
+            found.append(f"{name} p50 {stage['p50']:.1f} -> {current['p50']:.1f} ms")
+    old, new = baseline.get("throughput_qps"), results["throughput_qps"]
+    if old and new < old / (1 + threshold):
+        found.append(f"throughput {old:.2f} -> {new:.2f} questions/s")
+    old, new = baseline.get("peak_rss_mb"), results["peak_rss_mb"]
+    if old and new > old * (1 + threshold):
+        found.append(f"peak RSS {old:.0f} -> {new:.0f} MB")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--whisper-model", default="tiny")
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--first-token-delay", type=float, default=0.15)
+    parser.add_argument("--no-asr", action="store_true", help="use the question text")
+    parser.add_argument("--no-tts", action="store_true", help="skip speech synthesis")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown")
+    parser.add_argument("--output", help="also write the results JSON here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="revira-bench-") as workdir:
+        bench = Bench(args, workdir)
+        try:
+            results = bench.run()
+        finally:
+            bench.close()
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        sys.exit(f"No baseline at {args.baseline}; record one with --save-baseline and commit it.")
+    with open(args.baseline, "r", encoding="utf-8") as file:
+        baseline = json.load(file)
+    if baseline.get("meta", {}).get("fixtures") != results["meta"]["fixtures"]:
+        sys.exit("The baseline was recorded on other fixtures; record a new one.")
+    if baseline.get("meta") != results["meta"]:
+        print("Warning: baseline was recorded with different settings.")
+    found = regressions(results, baseline, args.threshold)
+    for regression in found:
+        print(f"REGRESSION: {regression}")
+    if found:
+        sys.exit(1)
+    print(f"No regressions beyond {100 * args.threshold:.0f}% of the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import re
+from typing import NamedTuple
+
+_encoding = None
+_encoding_loaded = False
+
+# Page markers written by read_pdf; they delimit pages and are never indexed.
+PAGE_MARKER = re.compile(r"^#+ (START|END) PAGE (\d+) #+$")
+
+
+def _get_encoding():
+    """cl100k_base, loaded on first use; it may need a download and is only
+    an approximation of the local model's tokenizer anyway."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:  # not installed, or no cached encoding offline
+            _encoding = None
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Model tokens in `text`, estimated at ~4 characters each without tiktoken."""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+class Chunk(NamedTuple):
+    text: str
+    page: int | None
+    start: int  # character offsets into the page, or into the file
+    end: int  # for sources without pages
+    tokens: int
+
+
+class _Unit(NamedTuple):
+    text: str
+    start: int
+    end: int
+    tokens: int
+    paragraph: bool  # first unit of a paragraph
+
+
+def _split_long(line: str, start: int, max_tokens: int):
+    """Split a line longer than the budget into word runs that fit it."""
+    piece_start = piece_end = None
+    tokens = 0
+    for match in re.finditer(r"\S+", line):
+        word_tokens = count_tokens(match.group()) + 1
+        if piece_start is not None and tokens + word_tokens > max_tokens:
+            yield line[piece_start:piece_end], start + piece_start, start + piece_end, tokens
+            piece_start = None
+        if piece_start is None:
+            piece_start, tokens = match.start(), 0
+        piece_end = match.end()
+        tokens += word_tokens
+    if piece_start is not None:
+        yield line[piece_start:piece_end], start + piece_start, start + piece_end, tokens
+
+
+class StructuredChunker:
+    """Packs whole lines into chunks of at most `max_tokens` tokens.
+
+    Lines are the unit of packing, so a timetable row or list item is never
+    cut in half; only a single line longer than the budget is split between
+    words. When a chunk fills up it is cut at the last paragraph break if
+    that keeps it at least half full. The last `overlap` tokens worth of
+    lines are repeated at the start of the next chunk on the same page,
+    but never across a paragraph or heading break: a chunk that starts a
+    new section gets no overlap, and one continuing a section repeats at
+    most back to the section's first line.
+    Everything is a single pass over the input.
+    """
+
+    def __init__(self, max_tokens: int = 200, overlap: int = 40):
+        self.max_tokens = max(8, max_tokens)
+        self.overlap = max(0, min(overlap, self.max_tokens // 2))
+
+    def _units(self, text: str, base: int, paragraph: bool):
+        """Yield the non-blank lines of a piece, offset by `base`."""
+        offset = 0
+        for line in text.splitlines(keepends=True):
+            start = offset
+            offset += len(line)
+            stripped = line.strip()
+            if not stripped or PAGE_MARKER.match(stripped):
+                paragraph = True
+                continue
+            lead = len(line) - len(line.lstrip())
+            start += base + lead
+            tokens = count_tokens(stripped) + 1  # the newline joining lines
+            if tokens <= self.max_tokens:
+                yield _Unit(stripped, start, start + len(stripped), tokens, paragraph)
+            else:
+                for piece, s, e, t in _split_long(stripped, start, self.max_tokens):
+                    yield _Unit(piece, s, e, t, paragraph)
+                    paragraph = False
+            paragraph = False
+
+    def chunks(self, pages):
+        """Stream Chunks from (page_number, text) pieces.
+
+        Pieces without a page number (text file blocks, which always end on
+        a line break) continue the current chunk, and their offsets run on
+        from the previous piece. A new page always starts a new chunk.
+        """
+        current: list[_Unit] = []
+        tokens = 0
+        page = None
+        base = 0
+        for piece_page, text in pages:
+            if piece_page is not None and piece_page != page:
+                if current:
+                    yield self._emit(current, page)
+                current, tokens, base = [], 0, 0
+            page = piece_page
+            for unit in self._units(text, base, paragraph=not current):
+                while current and tokens + unit.tokens > self.max_tokens:
+                    cut = self._cut_point(current)
+                    yield self._emit(current[:cut], page)
+                    following = current[cut] if cut < len(current) else unit
+                    overlap, current = self._overlap(current, cut, following), current[cut:]
+                    tokens = sum(u.tokens for u in current)
+                    overlap_tokens = sum(u.tokens for u in overlap)
+                    if tokens + overlap_tokens + unit.tokens <= self.max_tokens:
+                        current = overlap + current
+                        tokens += overlap_tokens
+                current.append(unit)
+                tokens += unit.tokens
+            base += len(text)
+        if current:
+            yield self._emit(current, page)
+
+    def _cut_point(self, units: list[_Unit]) -> int:
+        """Index to cut at: the last paragraph start past half the budget."""
+        tokens = 0
+        best = len(units)
+        for i, unit in enumerate(units):
+            if unit.paragraph and i and tokens >= self.max_tokens // 2:
+                best = i
+            tokens += unit.tokens
+        return best
+
+    def _overlap(self, units: list[_Unit], cut: int, following: _Unit) -> list[_Unit]:
+        """Trailing units of the emitted chunk to repeat before `following`."""
+        overlap: list[_Unit] = []
+        if following.paragraph:
+            return overlap  # the next chunk starts a section of its own
+        tokens = 0
+        for unit in reversed(units[1:cut]):
+            if tokens + unit.tokens > self.overlap:
+                break
+            overlap.append(unit)
+            tokens += unit.tokens
+            if unit.paragraph:
+                break  # don't reach back into the previous section
+        overlap.reverse()
+        return overlap
+
+    @staticmethod
+    def _emit(units: list[_Unit], page) -> Chunk:
+        return Chunk(
+            "\n".join(u.text for u in units),
+            page,
+            units[0].start,
+            units[-1].end,
+            sum(u.tokens for u in units),
+        )
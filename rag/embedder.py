@@ -0,0 +1,135 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Persistent embedding cache keyed on (model, content hash).
+
+    Vectors are stored as float32 blobs in SQLite, so a cache built for one
+    embedding model is never served for another.
+    """
+
+    def __init__(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT, hash TEXT, vector BLOB, PRIMARY KEY (model, hash))"
+        )
+        self._db.commit()
+
+    def get_many(self, model: str, hashes: list[str]) -> dict[str, list[float]]:
+        found: dict[str, list[float]] = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            # SQLite limits the number of bound parameters per statement.
+            for i in range(0, len(unique), 500):
+                batch = unique[i : i + 500]
+                rows = self._db.execute(
+                    "SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN "
+                    f"({','.join('?' * len(batch))})",
+                    [model, *batch],
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, model: str, items: dict[str, list[float]]):
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+                [(model, key, array("f", vec).tobytes()) for key, vec in items.items()],
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class Embedder:
+    """Embeds text through Ollama in bounded, concurrent batches.
+
+    Texts already in the cache are not sent again, duplicates within a call
+    are embedded once, and the missing texts are split into `batch_size`
+    requests run on at most `workers` threads of a pool kept for the
+    life of the embedder. Query embeddings are read from the cache but not
+    written to it, so one-off questions don't grow it without bound.
+    """
+
+    def __init__(self, model, batch_size=32, workers=2, cache_path=None, host=None):
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self.workers = max(1, workers)
+        self.cache = EmbeddingCache(cache_path) if cache_path else None
+        self.host = host
+        self._client = None
+        self._pool = ThreadPoolExecutor(max_workers=self.workers)
+
+    @property
+    def client(self):
+        if self._client is None:
+            import ollama  # deferred: importing it costs noticeable startup time
+
+            self._client = ollama.Client(host=self.host) if self.host else ollama
+        return self._client
+
+    def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        return self.client.embed(model=self.model, input=texts)["embeddings"]
+
+    def warm_up(self):
+        """Load the embedding model on the server, bypassing the cache."""
+        self._embed_batch(["warm up"])
+
+    def embed(self, texts: list[str], progress=None, cache=True) -> list[list[float]]:
+        """Return one embedding per text, in order.
+
+        `progress(done, total)` is called after each batch with the number
+        of unique texts embedded so far. With `cache=False` new embeddings
+        are not stored in the cache.
+        """
+        hashes = [content_hash(text) for text in texts]
+        vectors = self.cache.get_many(self.model, hashes) if self.cache else {}
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in vectors:
+                missing[key] = text
+        keys = list(missing)
+        batches = [
+            keys[i : i + self.batch_size] for i in range(0, len(keys), self.batch_size)
+        ]
+        done = 0
+        if progress:
+            progress(done, len(keys))
+        futures = {
+            self._pool.submit(self._embed_batch, [missing[k] for k in batch]): batch
+            for batch in batches
+        }
+        for future in as_completed(futures):
+            batch = futures[future]
+            embedded = dict(zip(batch, future.result()))
+            if self.cache and cache:
+                self.cache.put_many(self.model, embedded)
+            vectors.update(embedded)
+            done += len(batch)
+            if progress:
+                progress(done, len(keys))
+        return [vectors[key] for key in hashes]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed([text], cache=False)[0]
+
+    def close(self):
+        self._pool.shutdown(cancel_futures=True)
+        if self.cache:
+            self.cache.close()
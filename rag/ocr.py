@@ -0,0 +1,150 @@
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+
+_reader = None  # one warm easyocr.Reader per worker process
+
+
+def _init_worker(languages):
+    global _reader
+    import easyocr  # heavy (torch); only loaded in OCR worker processes
+
+    _reader = easyocr.Reader(languages, gpu=False, verbose=False)
+
+
+def _recognize(image: bytes) -> str:
+    """OCR one encoded image, keeping table rows on their own lines."""
+    boxes = _reader.readtext(image, detail=1)
+    return rows_to_text(boxes)
+
+
+def rows_to_text(boxes, delim=" | ") -> str:
+    """Group easyocr (bbox, text, confidence) boxes into lines of text.
+
+    Boxes whose vertical centres lie within half a median box height of a
+    row are joined left to right with `delim`, so timetable rows come out
+    as one line each for the line-aware chunker.
+    """
+    items = []
+    for bbox, text, _ in boxes:
+        ys = [point[1] for point in bbox]
+        items.append(((min(ys) + max(ys)) / 2, max(ys) - min(ys), bbox[0][0], text))
+    if not items:
+        return ""
+    heights = sorted(item[1] for item in items)
+    tolerance = max(heights[len(heights) // 2] / 2, 1.0)
+    rows: list[list] = []
+    for y, _, x, text in sorted(items):
+        if rows and abs(y - rows[-1][0]) <= tolerance:
+            rows[-1][1].append((x, text))
+        else:
+            rows.append([y, [(x, text)]])
+    return "\n".join(delim.join(text for _, text in sorted(cells)) for _, cells in rows)
+
+
+class OCRCache:
+    """Recognised text keyed on the hash of the encoded image bytes."""
+
+    def __init__(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS ocr (hash TEXT PRIMARY KEY, text TEXT)")
+        self._db.commit()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._db.execute("SELECT text FROM ocr WHERE hash = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, text: str):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO ocr VALUES (?, ?)", (key, text))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class OCRPool:
+    """Worker processes with a warm easyocr reader each.
+
+    The pool is started on first use and kept for the life of the app, so
+    the model load is paid once per worker instead of once per image.
+    Images whose bytes were recognised before are answered from the cache
+    without touching the pool. Workers are spawned rather than forked from
+    the running app, and a pool broken by a crashed worker is rebuilt.
+    """
+
+    def __init__(self, languages=("en",), workers=2, cache_path=None):
+        self.languages = list(languages)
+        self.workers = max(1, workers)
+        self.cache = OCRCache(cache_path) if cache_path else None
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.languages,),
+                )
+            return self._pool
+
+    def _reset_pool(self, pool):
+        """Drop `pool` if it is still the current one, so the next use builds a new one."""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, images: dict) -> dict:
+        """OCR {key: image} on the pool, retrying once on a fresh pool if a worker dies."""
+        for attempt in range(2):
+            pool = self._get_pool()
+            try:
+                futures = {key: pool.submit(_recognize, image) for key, image in images.items()}
+                return {key: future.result() for key, future in futures.items()}
+            except BrokenProcessPool:
+                self._reset_pool(pool)
+                if attempt:
+                    raise
+                print("OCR worker crashed; restarting the pool.")
+
+    def recognize(self, images: list[bytes]) -> list[str]:
+        """Return the text of each encoded image, OCRing the uncached ones in parallel."""
+        keys = [hashlib.sha256(image).hexdigest() for image in images]
+        texts: list[str | None] = [
+            self.cache.get(key) if self.cache else None for key in keys
+        ]
+        pending = {
+            key: image for key, image, text in zip(keys, images, texts) if text is None
+        }
+        results = self._run(pending) if pending else {}
+        if self.cache:
+            for key, text in results.items():
+                self.cache.put(key, text)
+        return [results[key] if text is None else text for key, text in zip(keys, texts)]
+
+    def read_image(self, path: str) -> str:
+        with open(path, "rb") as file:
+            return self.recognize([file.read()])[0]
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+        if self.cache:
+            self.cache.close()
@@ -1,31 +1,132 @@
+import multiprocessing
 import os
-import re
-import ollama
-from pypdf import PdfReader
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 
-# import easyocr
+from rag.chunker import StructuredChunker
+from rag.embedder import Embedder
+from rag.ocr import IMAGE_EXTENSIONS, OCRPool
 
 EMBED_MODEL = "nomic-embed-text"
 
 
-# def read_png(path, delim="|") -> str:
-#     reader = easyocr.Reader(["en"])
-#     result = reader.readtext(path)
-#     text = [item[1] for item in result]
-#     return delim.join(text)
+def _page_content(page, min_chars: int) -> tuple[str, list[bytes]]:
+    """Page text, plus its embedded images when the page has (almost) no text."""
+    text = page.extract_text() or ""
+    if len(text.strip()) >= min_chars:
+        return text, []
+    try:
+        return text, [image.data for image in page.images]
+    except Exception as e:  # unsupported image filters
+        print(f"Warning: couldn't extract images from page: {e}")
+        return text, []
 
 
-# TODO: Handle image based PDFs
-def read_pdf(path, delim: str = "#") -> str:
-    text: str = ""
+def _extract_page_range(path, start: int, stop: int, min_chars: int = 20):
+    """Extract pages [start, stop) in a worker process (1-based page numbers)."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    return [(i + 1, *_page_content(reader.pages[i], min_chars)) for i in range(start, stop)]
+
+
+def _iter_page_batches(path, workers, pages_per_task, min_chars):
+    """Yield lists of (page_number, text, images), in page order."""
+    from pypdf import PdfReader  # deferred until a PDF is actually read
+
     reader = PdfReader(path)
-    i = 1
-    for page in reader.pages:
-        text += f"{20 * delim} START PAGE {i} {20 * delim}\n\n"
-        text += page.extract_text()
-        text += f"\n\n{20 * delim} END PAGE {i} {20 * delim}\n\n"
-        i += 1
-    return text
+    total = len(reader.pages)
+    if workers <= 1 or total <= 2 * pages_per_task:
+        for start in range(0, total, pages_per_task):
+            stop = min(start + pages_per_task, total)
+            yield [
+                (i + 1, *_page_content(reader.pages[i], min_chars))
+                for i in range(start, stop)
+            ]
+        return
+    del reader
+    ranges = iter(
+        (start, min(start + pages_per_task, total))
+        for start in range(0, total, pages_per_task)
+    )
+    # Spawned, not forked: the caller may be the GUI process with live threads.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        in_flight = deque()
+        for start, stop in islice(ranges, 2 * workers):
+            in_flight.append(
+                pool.submit(_extract_page_range, path, start, stop, min_chars)
+            )
+        while in_flight:
+            batch = in_flight.popleft().result()
+            for start, stop in islice(ranges, 1):
+                in_flight.append(
+                    pool.submit(_extract_page_range, path, start, stop, min_chars)
+                )
+            yield batch
+
+
+def iter_pdf_pages(
+    path, workers: int | None = None, pages_per_task: int = 8, ocr=None, min_chars: int = 20
+):
+    """Yield (page_number, text) lazily, in page order.
+
+    Small PDFs are read in-process. Larger ones are split into page ranges
+    extracted by a process pool, with only a few ranges in flight at once so
+    memory stays bounded by the window rather than the document. Pages with
+    fewer than `min_chars` characters of text are treated as scans: their
+    images are sent to the `ocr` pool, a batch of pages at a time.
+    """
+    workers = workers or min(4, os.cpu_count() or 1)
+    for batch in _iter_page_batches(path, workers, pages_per_task, min_chars):
+        scanned = [images for _, _, images in batch if images]
+        if ocr is not None and scanned:
+            texts = iter(ocr.recognize([image for images in scanned for image in images]))
+            batch = [
+                (page, "\n".join(next(texts) for _ in images) if images else text, [])
+                for page, text, images in batch
+            ]
+        for page, text, _ in batch:
+            yield page, text
+
+
+def read_pdf(path, delim: str = "#") -> str:
+    parts: list[str] = []
+    for i, text in iter_pdf_pages(path):
+        parts.append(f"{20 * delim} START PAGE {i} {20 * delim}\n\n")
+        parts.append(text)
+        parts.append(f"\n\n{20 * delim} END PAGE {i} {20 * delim}\n\n")
+    return "".join(parts)
+
+
+def iter_txt_blocks(path, block_chars: int = 65536):
+    """Yield (None, text) blocks of whole lines from a text file."""
+    with open(path, "r", encoding="utf-8") as file:
+        block: list[str] = []
+        size = 0
+        for line in file:
+            block.append(line)
+            size += len(line)
+            if size >= block_chars:
+                yield None, "".join(block)
+                block, size = [], 0
+        if block:
+            yield None, "".join(block)
+
+
+def iter_document(path, workers: int | None = None, ocr=None):
+    """Yield (page_number, text) pieces of a supported document, or None.
+
+    Images and scanned PDF pages are only read when an `ocr` pool is given.
+    """
+    if path.endswith(".pdf"):
+        return iter_pdf_pages(path, workers, ocr=ocr)
+    if path.endswith(".txt"):
+        return iter_txt_blocks(path)
+    if ocr is not None and path.lower().endswith(IMAGE_EXTENSIONS):
+        return iter([(None, ocr.read_image(path))])
+    return None
 
 
 def read_txtf(path):
@@ -33,6 +134,29 @@ def read_txtf(path):
         return file.read()
 
 
+_default_ocr = None
+
+
+def read_png(path, ocr: OCRPool | None = None) -> str:
+    global _default_ocr
+    if ocr is None:
+        if _default_ocr is None:
+            _default_ocr = OCRPool(workers=1)
+        ocr = _default_ocr
+    return ocr.read_image(path)
+
+
+def read_document(path) -> str | None:
+    """Read a supported document, or return None for unsupported types."""
+    if path.endswith(".pdf"):
+        return read_pdf(path)
+    if path.endswith(".txt"):
+        return read_txtf(path)
+    if path.lower().endswith(IMAGE_EXTENSIONS):
+        return read_png(path)
+    return None
+
+
 def read_txtd(path) -> dict[str, str]:
     text_contents: dict[str, str] = {}
     directory = os.path.join(path)
@@ -45,28 +169,22 @@ def read_txtd(path) -> dict[str, str]:
     return text_contents
 
 
-def chunk_splitter(text, chunk_size=100) -> list[str]:
-    words = re.findall(r"\S+", text)
-
-    chunks: list[str] = []
-    current_chunk = []
-    word_count = 0
+def iter_chunks(pages, max_tokens=200, overlap=40):
+    """Stream Chunks (text, page, start, end, tokens) from (page, text) pieces."""
+    return StructuredChunker(max_tokens, overlap).chunks(pages)
 
-    for word in words:
-        current_chunk.append(word)
-        word_count += 1
 
-        if word_count >= chunk_size:
-            chunks.append(" ".join(current_chunk))
-            current_chunk = []
-            word_count = 0
+def chunk_splitter(text, max_tokens=200, overlap=40) -> list[str]:
+    return [chunk.text for chunk in iter_chunks([(None, text)], max_tokens, overlap)]
 
-    if current_chunk:
-        chunks.append(" ".join(current_chunk))
 
-    return chunks
+_default_embedder = None
 
 
-def get_embedding(chunks: list[str]):
-    embeds = ollama.embed(model=EMBED_MODEL, input=chunks)
-    return embeds.get("embeddings", [])
+def get_embedding(chunks: list[str], embedder: Embedder | None = None, progress=None):
+    global _default_embedder
+    if embedder is None:
+        if _default_embedder is None:
+            _default_embedder = Embedder(EMBED_MODEL)
+        embedder = _default_embedder
+    return embedder.embed(chunks, progress=progress)
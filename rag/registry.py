@@ -0,0 +1,55 @@
+import json
+import os
+import threading
+
+
+class DocumentRegistry:
+    """Remembers what has been ingested from each source file.
+
+    For every source it stores the file mtime, the content hash and the ids
+    of the chunks written to the vector store, so re-ingesting a file can be
+    reduced to a chunk-level diff. Saved as JSON next to the other caches.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.documents: dict[str, dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    self.documents = json.load(file)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Warning: ignoring unreadable document registry: {e}")
+
+    def get(self, source: str) -> dict | None:
+        return self.documents.get(source)
+
+    def sources(self) -> list[str]:
+        return list(self.documents)
+
+    def fingerprint(self) -> list[tuple[str, str]]:
+        """(source, content hash) pairs; changes whenever any document does."""
+        return sorted((source, doc["hash"]) for source, doc in self.documents.items())
+
+    def update(self, source: str, mtime: float, content_hash: str, chunk_ids: list[str]):
+        with self._lock:
+            self.documents[source] = {
+                "mtime": mtime,
+                "hash": content_hash,
+                "chunks": chunk_ids,
+            }
+            self._save()
+
+    def remove(self, source: str):
+        with self._lock:
+            if self.documents.pop(source, None) is not None:
+                self._save()
+
+    def _save(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self.documents, file)
+        os.replace(tmp_path, self.path)
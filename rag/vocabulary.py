@@ -0,0 +1,54 @@
+import re
+from collections import Counter
+
+# Runs of capitalised words ("Data Structures", "Lab Session"), allowing
+# short joining words inside ("Theory of Computation") and course codes.
+_PHRASE = re.compile(
+    r"\b[A-Z][\w+#&'-]*(?:[ \t]+(?:(?:of|and|for|in|to|&)[ \t]+)?[A-Z][\w+#&'-]*)*"
+)
+
+_COMMON = set(
+    """monday tuesday wednesday thursday friday saturday sunday january february
+    march april may june july august september october november december the a an
+    this that these i we you it if and or in on at for to of with by from what when
+    where who how page am pm""".split()
+)
+
+
+def extract_vocabulary(documents, limit=40) -> list[str]:
+    """Return the `limit` most frequent proper phrases in `documents`.
+
+    Course and room names in timetables and syllabi are capitalised, so
+    repeated capitalised phrases make a good vocabulary for seeding the
+    speech recogniser. Weekdays, months and sentence-initial stopwords are
+    left out.
+    """
+    counts = Counter()
+    first_seen = {}
+    for document in documents:
+        for match in _PHRASE.finditer(document):
+            phrase = " ".join(match.group().split()).strip("-'")
+            words = phrase.lower().split()
+            start, end = 0, len(words)
+            while start < end and words[start] in _COMMON:
+                start += 1
+            while end > start and words[end - 1] in _COMMON:
+                end -= 1
+            phrase = " ".join(phrase.split()[start:end])
+            if len(phrase) < 3:
+                continue
+            counts[phrase] += 1
+            first_seen.setdefault(phrase, len(first_seen))
+    ranked = sorted(counts, key=lambda phrase: (-counts[phrase], first_seen[phrase]))
+    return ranked[:limit]
+
+
+def vocabulary_prompt(phrases, max_chars=400) -> str | None:
+    """Join phrases into a comma-separated Whisper prompt of at most `max_chars`."""
+    prompt = ""
+    for phrase in phrases:
+        candidate = f"{prompt}, {phrase}" if prompt else phrase
+        if len(candidate) > max_chars:
+            break
+        prompt = candidate
+    return f"{prompt}." if prompt else None
@@ -1,3 +1,7 @@
+import time
+
+STARTED_AT = time.perf_counter()  # before the imports below, for the startup report
+
 from EduTalkAssistant import EduTalkAssistant
 import sys
 
@@ -5,7 +9,7 @@ import sys
 def main():
     if sys.version_info < (3, 8):
         print("Warning: EduTalk requires Python 3.8 or higher.")
-    assistant = EduTalkAssistant()
+    assistant = EduTalkAssistant(started_at=STARTED_AT)
     try:
         assistant.run()
     except KeyboardInterrupt:
@@ -0,0 +1,263 @@
+"""Answer recorded or written questions without the window or audio devices.
+
+    python revira_batch.py recordings/ --output answers.jsonl --concurrency 4
+    python revira_batch.py questions.txt --docs examples/timetable_example.txt
+
+INPUT is a directory of audio files or a text file with one question per
+line. Audio files are transcribed `--asr-batch` at a time in one batched
+Whisper decode (a padded log-mel batch with openai-whisper, the batched
+pipeline with faster-whisper), spread over `--asr-workers` worker
+processes (or in-process with one worker), while earlier questions are
+already being answered. Transcripts are embedded in batches, then retrieval and generation run on
+`--concurrency` threads. Each answer is written to the output JSONL as
+soon as it is done, with per-item timings, and the total throughput is
+printed at the end.
+"""
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from ASRWorker import ASRWorker
+from ConfigParser import ConfigParser
+from DocumentIngestor import DocumentIngestor
+from OllamaConnector import OllamaConnector
+from Retriever import Retriever
+from SpeechRecognizer import SpeechRecognizer
+from VectorStore import create_vector_store
+from rag.embedder import Embedder
+from rag.rag import EMBED_MODEL
+from rag.registry import DocumentRegistry
+
+CONFIG_FILEPATH = "config.toml"
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac", ".ogg", ".m4a", ".webm")
+
+
+def load_items(path):
+    """Questions to answer: audio files in a directory, or lines of a text file."""
+    if os.path.isdir(path):
+        return [
+            {"id": os.path.splitext(name)[0], "audio": os.path.join(path, name)}
+            for name in sorted(os.listdir(path))
+            if name.lower().endswith(AUDIO_EXTENSIONS)
+        ]
+    with open(path, "r", encoding="utf-8") as file:
+        lines = [line.strip() for line in file]
+    return [{"id": str(n), "question": line} for n, line in enumerate(lines, 1) if line]
+
+
+def milliseconds(start):
+    return round(1000 * (time.perf_counter() - start), 1)
+
+
+class BatchRunner:
+    def __init__(self, config, concurrency, batch_size, asr_workers=1, asr_batch=8):
+        self.config = config
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        self.asr_workers = max(1, asr_workers)
+        self.asr_batch = max(1, asr_batch)
+        base_url = config.get_value("ollama", "url").split("/api/", 1)[0]
+        self.embedder = Embedder(
+            EMBED_MODEL,
+            batch_size=config.get_value("embedding", "batch_size", 32),
+            workers=config.get_value("embedding", "workers", 2),
+            cache_path=config.get_value("embedding", "cache_path"),
+            host=base_url,
+        )
+        self.vector_store = create_vector_store(config)
+        self.retriever = Retriever(self.vector_store, self.embedder, config)
+        self.recognizer = None
+        self._local = threading.local()
+        self._connectors = []
+        self._lock = threading.Lock()
+
+    def ingest(self, path):
+        ingestor = DocumentIngestor(
+            self.vector_store,
+            self.embedder,
+            DocumentRegistry(
+                self.config.get_value("vectorstore", "registry_path", ".revira/documents.json")
+            ),
+            status=print,
+            batch_size=self.config.get_value("ingest", "batch_size", 64),
+            pdf_workers=self.config.get_value("ingest", "pdf_workers"),
+            chunk_tokens=self.config.get_value("ingest", "chunk_tokens", 200),
+            chunk_overlap=self.config.get_value("ingest", "chunk_overlap", 40),
+        )
+        if os.path.isdir(path):
+            print(ingestor.ingest_directory(path))
+        else:
+            print(ingestor.ingest_file(path))
+
+    def _connector(self):
+        """One connector (and keep-alive session) per answering thread."""
+        if not hasattr(self._local, "ollama"):
+            self._local.ollama = OllamaConnector(self.config)
+            with self._lock:
+                self._connectors.append(self._local.ollama)
+        return self._local.ollama
+
+    def transcribe_batch(self, batch):
+        """Transcribe the audio items of `batch` in one batched decode."""
+        audio = [item for item in batch if "audio" in item]
+        for item in batch:
+            item["timings_ms"] = {}
+        if audio:
+            start = time.perf_counter()
+            texts = self.recognizer.transcribe_batch([item["audio"] for item in audio])
+            elapsed = milliseconds(start)
+            for item, text in zip(audio, texts):
+                item["timings_ms"]["transcribe"] = elapsed  # the whole batch's wall time
+                if text.startswith("Error:"):
+                    item["error"] = text
+                elif not text:
+                    item["error"] = "No speech detected"
+                item["question"] = text
+        return batch
+
+    def transcribe(self, items, out):
+        """Feed items to `out` in order, transcribing audio ones in batches."""
+        batches = [items[i : i + self.asr_batch] for i in range(0, len(items), self.asr_batch)]
+        with ThreadPoolExecutor(max_workers=self.asr_workers) as pool:
+            for batch in pool.map(self.transcribe_batch, batches):
+                for item in batch:
+                    out.put(item)
+        out.put(None)
+
+    def answer(self, item, embedding):
+        ollama = self._connector()
+        ollama.context = []  # every question stands alone
+        timings = item["timings_ms"]
+        start = time.perf_counter()
+        prompt, hits = self.retriever.build_prompt(item["question"], embedding)
+        timings["retrieve"] = milliseconds(start)
+        item["sources"] = sorted({m.get("source") for _, m in hits if m.get("source")})
+
+        start = time.perf_counter()
+
+        def first_sentence(_):
+            timings.setdefault("first_sentence", milliseconds(start))
+
+        item["answer"] = ollama.generate_response(prompt, first_sentence)
+        timings["generate"] = milliseconds(start)
+        if ollama.last_error is not None:
+            item["error"] = str(ollama.last_error)
+        return item
+
+    def run(self, items, output):
+        if any("audio" in item for item in items):
+            if self.asr_workers > 1 or self.config.get_value("whisper", "out_of_process", False):
+                self.recognizer = ASRWorker(self.config, self.asr_workers)
+            else:
+                self.recognizer = SpeechRecognizer(self.config)
+            if not self.recognizer.load_model():
+                raise SystemExit("Couldn't load the Whisper model.")
+        self.retriever.warm_up()
+        if self.recognizer:
+            self.recognizer.set_vocabulary(self.retriever.documents())
+
+        transcripts = queue.Queue()
+        producer = threading.Thread(target=self.transcribe, args=(items, transcripts))
+        producer.daemon = True
+        producer.start()
+
+        latencies = []
+        failures = 0
+        write_lock = threading.Lock()
+
+        def write(item, started):
+            nonlocal failures
+            timings = item["timings_ms"]
+            timings["total"] = round(timings.get("transcribe", 0) + milliseconds(started), 1)
+            with write_lock:
+                latencies.append(timings["total"])
+                failures += "error" in item
+                output.write(json.dumps(item) + "\n")
+                output.flush()
+
+        def answer(item, embedding, started):
+            try:
+                self.answer(item, embedding)
+            except Exception as e:
+                item["error"] = str(e)
+            write(item, started)
+
+        start = time.perf_counter()
+        finished = False
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            while not finished:
+                batch = []
+                item = transcripts.get()  # wait for at least one
+                while item is not None:
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    try:
+                        item = transcripts.get_nowait()
+                    except queue.Empty:
+                        break
+                finished = item is None
+                ready = [item for item in batch if "error" not in item]
+                for item in batch:
+                    if "error" in item:
+                        write(item, time.perf_counter())
+                if not ready:
+                    continue
+                embed_start = time.perf_counter()
+                questions = [item["question"] for item in ready]
+                embeddings = self.embedder.embed(questions, cache=False)
+                embed_ms = milliseconds(embed_start)
+                for item, embedding in zip(ready, embeddings):
+                    item["timings_ms"]["embed_batch"] = embed_ms
+                    pool.submit(answer, item, embedding, embed_start)
+        elapsed = time.perf_counter() - start
+
+        for connector in self._connectors:
+            connector.close()
+        if self.recognizer:
+            self.recognizer.close()
+        self.embedder.close()
+        return len(items), failures, elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="directory of audio files or text file of questions")
+    parser.add_argument("--output", default="answers.jsonl")
+    parser.add_argument("--concurrency", type=int, default=4, help="questions answered at once")
+    parser.add_argument("--batch-size", type=int, default=16, help="transcripts per embed batch")
+    parser.add_argument("--asr-workers", type=int, help="Whisper worker processes for audio")
+    parser.add_argument("--asr-batch", type=int, help="audio files per batched Whisper decode")
+    parser.add_argument("--docs", help="document or folder to ingest first")
+    parser.add_argument("--config", default=CONFIG_FILEPATH)
+    args = parser.parse_args()
+
+    config = ConfigParser(args.config)
+    config.read_config()
+    items = load_items(args.input)
+    if not items:
+        raise SystemExit(f"No questions found in {args.input}")
+    asr_workers = args.asr_workers or config.get_value("whisper", "batch_workers", 2)
+    asr_batch = args.asr_batch or config.get_value("whisper", "batch_size", 8)
+    runner = BatchRunner(config, args.concurrency, args.batch_size, asr_workers, asr_batch)
+    if args.docs:
+        runner.ingest(args.docs)
+
+    with open(args.output, "w", encoding="utf-8") as output:
+        total, failures, elapsed, latencies = runner.run(items, output)
+    print(
+        f"Answered {total - failures}/{total} questions in {elapsed:.1f} s "
+        f"({total / elapsed:.2f} questions/s); "
+        f"latency p50 {np.percentile(latencies, 50):.0f} ms, "
+        f"p95 {np.percentile(latencies, 95):.0f} ms. Results in {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
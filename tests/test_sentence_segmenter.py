@@ -0,0 +1,22 @@
+from SentenceSegmenter import SentenceSegmenter
+
+
+def segment(tokens):
+    segmenter = SentenceSegmenter()
+    segments = []
+    for token in tokens:
+        segments += segmenter.feed(token)
+    return segments + segmenter.flush()
+
+
+def test_emoji_in_own_token_ends_segment():
+    tokens = ["Great job ", "🎉", " Next sentence is here", " and more words."]
+    assert segment(tokens) == ["Great job", "Next sentence is here and more words."]
+
+
+def test_emoji_run_split_across_tokens():
+    assert segment(["Well done ", "🎉", "🎉", " Keep going."]) == ["Well done", "Keep going."]
+
+
+def test_trailing_emoji_is_dropped():
+    assert segment(["All set ", "👍"]) == ["All set"]